@@ -19,6 +19,15 @@ class Settings(BaseSettings):
     # Playwright Configuration
     playwright_headless: bool = True
     playwright_timeout: int = 30000  # milliseconds
+    playwright_browser_count: int = 1  # browser processes sharing the page load
+    playwright_context_pool_size: int = 4  # pre-warmed contexts (= concurrent pages) per browser, fresh per request
+    playwright_pool_timeout: int = 30000  # milliseconds a request waits for a free pooled page
+    playwright_wait_until: str = "domcontentloaded"  # page.goto load state; "load"/"networkidle" for JS-heavy sites
+    playwright_block_stylesheets: bool = False  # also abort CSS; breaks selectors relying on layout/visibility
+    
+    # SSH Transfer Configuration
+    ssh_pool_size: int = 2  # idle connections kept per route
+    ssh_pool_idle_timeout: int = 300  # seconds before an idle connection is dropped
     
     # Logging Configuration
     log_level: str = "INFO"
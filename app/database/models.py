@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Optional, List, Dict, Any
 import json
 import logging
+from functools import lru_cache
 from app.services.encryption_service import encryption_service
 
 logger = logging.getLogger(__name__)
@@ -90,6 +91,18 @@ class XMLTemplate:
         }
 
 
+@lru_cache(maxsize=64)
+def _decrypt_credentials(encrypted_password: str, encrypted_private_key: str) -> Dict[str, str]:
+    """Decrypt a route's credentials once; keyed by the ciphertexts so changed credentials miss the cache
+
+    Raises on a failed decrypt, so lru_cache keeps only successful results and the next call retries.
+    """
+    return {
+        "password": encryption_service.decrypt(encrypted_password) if encrypted_password else "",
+        "private_key": encryption_service.decrypt(encrypted_private_key) if encrypted_private_key else ""
+    }
+
+
 class SSHTransferRoute:
     """Model for SSH transfer routes with encrypted credentials"""
     
@@ -133,10 +146,8 @@ class SSHTransferRoute:
     def get_decrypted_credentials(self) -> Dict[str, str]:
         """Get decrypted credentials for SSH connection"""
         try:
-            return {
-                "password": encryption_service.decrypt(self.password) if self.password else "",
-                "private_key": encryption_service.decrypt(self.private_key) if self.private_key else ""
-            }
+            # Copy, so callers cannot alter the cached entry
+            return dict(_decrypt_credentials(self.password, self.private_key))
         except Exception as e:
             logger.error(f"Failed to decrypt SSH credentials: {e}")
             return {"password": "", "private_key": ""}
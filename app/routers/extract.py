@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse
 from typing import Optional
+import orjson
 from app.models import ExtractRequest, ExtractResponse
 from app.services.extract_service import ExtractService
 from app.services.transform_service import TransformService
@@ -9,7 +11,7 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/extract", tags=["Extract"])
+router = APIRouter(prefix="/extract", tags=["Extract"], default_response_class=ORJSONResponse)
 
 
 @router.post("", response_model=ExtractResponse)
@@ -121,9 +123,8 @@ async def extract_to_taifun_xml(
         selectors_dict = None
         if custom_selectors:
             try:
-                import json
-                selectors_dict = json.loads(custom_selectors)
-            except json.JSONDecodeError:
+                selectors_dict = orjson.loads(custom_selectors)
+            except orjson.JSONDecodeError:
                 raise HTTPException(
                     status_code=400,
                     detail="Invalid JSON format in custom_selectors"
@@ -133,7 +134,8 @@ async def extract_to_taifun_xml(
         logger.info(f"Extracting work order data from: {source_url}")
         extracted_data = await playwright_service.extract_work_order_data(
             source_url, 
-            custom_selectors=selectors_dict
+            custom_selectors=selectors_dict,
+            include_html=True  # Die Transform-Rule arbeitet auf dem Seiten-HTML
         )
         
         # 3. Mit Taifun Transform-Rule transformieren
@@ -185,7 +187,8 @@ async def extract_to_taifun_xml(
 @router.post("/work-order-data")
 async def extract_work_order_data_only(
     source_url: str = Form(..., description="URL der Auftragsseite"),
-    custom_selectors: Optional[str] = Form(None, description="Optional: JSON mit benutzerdefinierten CSS-Selektoren")
+    custom_selectors: Optional[str] = Form(None, description="Optional: JSON mit benutzerdefinierten CSS-Selektoren"),
+    include_html: bool = Form(False, description="Optional: Vollständiges Seiten-HTML als page_html mitliefern")
 ):
     """
     Extrahiert nur die Auftragsdaten von einer Website (ohne XML-Generierung)
@@ -203,9 +206,8 @@ async def extract_work_order_data_only(
         selectors_dict = None
         if custom_selectors:
             try:
-                import json
-                selectors_dict = json.loads(custom_selectors)
-            except json.JSONDecodeError:
+                selectors_dict = orjson.loads(custom_selectors)
+            except orjson.JSONDecodeError:
                 raise HTTPException(
                     status_code=400,
                     detail="Invalid JSON format in custom_selectors"
@@ -214,7 +216,8 @@ async def extract_work_order_data_only(
         # Auftragsdaten extrahieren
         extracted_data = await playwright_service.extract_work_order_data(
             source_url, 
-            custom_selectors=selectors_dict
+            custom_selectors=selectors_dict,
+            include_html=include_html
         )
         
         return {
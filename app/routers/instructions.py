@@ -3,6 +3,7 @@
 from fastapi import APIRouter, HTTPException
 from typing import List
 from app.database.models import etl_db, URLInstruction
+from app.services.extract_service import ExtractService
 import logging
 
 
@@ -49,6 +50,7 @@ async def delete_instruction(instruction_id: int):
     try:
         deleted = etl_db.delete_instruction(instruction_id)
         if deleted:
+            ExtractService.invalidate_instructions()
             return {
                 "message": f"Instruction {instruction_id} deleted successfully",
                 "deleted": True,
@@ -81,6 +83,7 @@ async def add_instruction(
             description=description,
         )
         instruction_id = etl_db.add_instruction(instruction)
+        ExtractService.invalidate_instructions()
         return {
             "message": "Instruction added successfully",
             "instruction_id": instruction_id,
@@ -2,6 +2,9 @@
 
 from fastapi import APIRouter, HTTPException
 from app.database.init_data import initialize_all_test_data
+from app.services.extract_service import ExtractService
+from app.services.ssh_transfer_service import SSHTransferService
+from app.services.transform_service import TransformService
 import logging
 
 
@@ -16,6 +19,9 @@ async def initialize_test_data():
     """Initialize database with test data."""
     try:
         instruction_ids = initialize_all_test_data()
+        ExtractService.invalidate_instructions()
+        SSHTransferService.invalidate_routes()
+        TransformService.invalidate_rules()
         return {
             "message": "Test data initialized successfully",
             "results": instruction_ids,
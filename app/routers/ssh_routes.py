@@ -72,6 +72,8 @@ async def add_ssh_route(
             description=description,
         )
         route_db_id = etl_db.add_ssh_route(ssh_route)
+        # Cached route and pooled connections may still use the previous settings of this route
+        SSHTransferService.invalidate_routes(route_id)
         return {
             "message": "SSH route added successfully",
             "route_db_id": route_db_id,
@@ -90,6 +92,7 @@ async def delete_ssh_route(route_db_id: int):
     try:
         deleted = etl_db.delete_ssh_route(route_db_id)
         if deleted:
+            SSHTransferService.invalidate_routes()
             return {
                 "message": f"SSH route {route_db_id} deleted successfully",
                 "deleted": True,
@@ -24,10 +24,14 @@ async def transfer_data(request: TransferRequest):
             "method": "POST",
             "headers": {"Authorization": "Bearer token"},
             "custom_fields": {"source": "etl_api"},
-            "timeout": 30
+            "timeout": 30,
+            "batch": false
         }
     }
     ```
+
+    Mit `"batch": true` werden gleichzeitige Transfers an dasselbe Ziel
+    gesammelt und als ein Request `{"batch": [...]}` gesendet.
     
     **API:**
     ```json
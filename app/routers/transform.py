@@ -19,7 +19,9 @@ async def transform_data(request: TransformRequest):
     - `uppercase`, `lowercase`, `title_case`, `capitalize`: Groß-/Kleinschreibung
     - `strip`: Whitespace entfernen
     - `replace`: {"old": "text", "new": "replacement"}
-    - `regex_replace`: {"pattern": "regex", "replacement": "text"}
+    - `regex_replace`: {"pattern": "regex", "replacement": "text"}, optional `"strict_linear": true`
+      führt das Muster mit RE2 (google-re2) in linearer Zeit aus und lehnt Muster ab, die RE2
+      nicht unterstützt (Lookaround, Rückverweise); unter RE2 erkennen `\\w` und `\\b` nur ASCII
     - `prefix`, `suffix`: Text hinzufügen
     
     **Numerische Transformationen:**
@@ -3,6 +3,7 @@
 from fastapi import APIRouter, HTTPException
 from typing import List
 from app.database.models import etl_db, TransformRule
+from app.services.transform_service import TransformService
 import logging
 
 
@@ -63,6 +64,7 @@ async def add_transform_rule(
             description=description,
         )
         rule_id = etl_db.add_transform_rule(transform_rule)
+        TransformService.invalidate_rules()
         return {
             "message": "Transform rule added successfully",
             "rule_id": rule_id,
@@ -81,6 +83,7 @@ async def delete_transform_rule(rule_id: int):
     try:
         deleted = etl_db.delete_transform_rule(rule_id)
         if deleted:
+            TransformService.invalidate_rules()
             return {
                 "message": f"Transform rule {rule_id} deleted successfully",
                 "deleted": True,
@@ -1,12 +1,28 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+from functools import lru_cache
 import json
 import logging
 import asyncio
+from cachetools import TTLCache
 from app.services.playwright_service import playwright_service
 from app.database.models import etl_db, URLInstruction
 
 logger = logging.getLogger(__name__)
 
+# Body text truncated in the browser so only max_chars characters cross CDP
+_BODY_TEXT_JS = "(n) => { const t = document.body.innerText || ''; return n ? t.slice(0, n) : t; }"
+
+# URL instruction lookups (including misses) keyed by source URL; cleared when instructions change
+_instruction_cache: TTLCache = TTLCache(maxsize=512, ttl=60)
+_instruction_lock = asyncio.Lock()
+_CACHE_MISS = object()
+
+
+@lru_cache(maxsize=4096)
+def _parse_path(path: str, delimiter: str) -> Tuple[Tuple[str, Optional[int]], ...]:
+    """Split a dot-notation path once into (key, list index) pairs"""
+    return tuple((key, int(key) if key.isdigit() else None) for key in path.split(delimiter))
+
 
 class ExtractService:
     """Service for data extraction operations"""
@@ -26,7 +42,7 @@ class ExtractService:
                     raise RuntimeError("Playwright browser not available")
                 
                 # Check for URL-specific instructions in database
-                url_instruction = etl_db.get_instruction_for_url(source_url)
+                url_instruction = await ExtractService._get_instruction_for_url(source_url)
                 
                 if url_instruction:
                     logger.info(f"Found database instructions for URL: {source_url}")
@@ -60,15 +76,35 @@ class ExtractService:
             logger.error(f"Extract error: {e}")
             raise
     
+    @staticmethod
+    async def _get_instruction_for_url(source_url: str) -> Optional[URLInstruction]:
+        """Get URL instruction from cache, querying the database once per URL on a miss"""
+        instruction = _instruction_cache.get(source_url, _CACHE_MISS)
+        if instruction is not _CACHE_MISS:
+            return instruction
+        
+        async with _instruction_lock:
+            # Another request may have filled the entry while we waited
+            instruction = _instruction_cache.get(source_url, _CACHE_MISS)
+            if instruction is _CACHE_MISS:
+                instruction = etl_db.get_instruction_for_url(source_url)
+                _instruction_cache[source_url] = instruction
+        
+        return instruction
+    
+    @staticmethod
+    def invalidate_instructions():
+        """Drop cached URL instructions after instructions were added or deleted"""
+        _instruction_cache.clear()
+    
     @staticmethod
     async def _execute_url_instructions(url: str, instruction: URLInstruction) -> Dict[str, Any]:
         """Execute URL-specific instructions using Playwright"""
         if not playwright_service.is_available():
             raise RuntimeError("Playwright browser not available")
         
-        page = await playwright_service.browser.new_page()
-        
-        try:
+        # Pooled pages already have the scroll helpers (window.__scroll_*) installed
+        async with playwright_service.new_page() as page:
             # Navigate to the URL
             logger.info(f"Navigating to: {url}")
             await page.goto(url, timeout=30000)
@@ -87,8 +123,9 @@ class ExtractService:
                     if selector:
                         await page.click(selector)
                     elif text:
-                        # Click on element containing specific text
-                        await page.click(f"text={text}")
+                        # Click on the first element containing specific text
+                        locator = page.get_by_text(text, exact=step.get("exact", False))
+                        await locator.first.click(timeout=step.get("timeout"))
                     
                     # Wait for navigation if specified
                     if step.get("wait_for_navigation", True):
@@ -100,14 +137,14 @@ class ExtractService:
                     
                     if direction == "down":
                         if amount == "end":
-                            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                            await page.evaluate("() => window.__scroll_down_end()")
                         else:
-                            await page.evaluate(f"window.scrollBy(0, {amount})")
+                            await page.evaluate("(n) => window.__scroll_by(n)", amount)
                     elif direction == "up":
                         if amount == "top":
-                            await page.evaluate("window.scrollTo(0, 0)")
+                            await page.evaluate("() => window.__scroll_up_top()")
                         else:
-                            await page.evaluate(f"window.scrollBy(0, -{amount})")
+                            await page.evaluate("(n) => window.__scroll_by(-n)", amount)
                     
                     # Wait a bit for content to load
                     await asyncio.sleep(1)
@@ -141,18 +178,14 @@ class ExtractService:
                 result["content_type"] = "html"
             
             elif instruction.return_format == "text":
-                text_content = await page.inner_text("body")
-                if instruction.max_chars:
-                    text_content = text_content[:instruction.max_chars]
+                text_content = await page.evaluate(_BODY_TEXT_JS, instruction.max_chars)
                 result["text"] = text_content
                 result["content_type"] = "text"
             
             elif instruction.return_format == "json":
                 # Extract structured data
                 title = await page.title()
-                text_content = await page.inner_text("body")
-                if instruction.max_chars:
-                    text_content = text_content[:instruction.max_chars]
+                text_content = await page.evaluate(_BODY_TEXT_JS, instruction.max_chars)
                 
                 result = {
                     "title": title,
@@ -171,9 +204,6 @@ class ExtractService:
             
             logger.info(f"Successfully executed {len(instruction.instructions)} instruction steps")
             return result
-            
-        finally:
-            await page.close()
     
     @staticmethod
     def _extract_from_data(data: Any, config: Optional[Dict[str, Any]] = None) -> Any:
@@ -242,18 +272,11 @@ class ExtractService:
     @staticmethod
     def _get_nested_value(data: dict, path: str, delimiter: str = ".") -> Any:
         """Get nested value from dictionary using dot notation"""
-        keys = path.split(delimiter)
         current = data
         
         try:
-            for key in keys:
-                if isinstance(current, dict):
-                    current = current[key]
-                elif isinstance(current, list) and key.isdigit():
-                    index = int(key)
-                    current = current[index]
-                else:
-                    return None
+            for key, index in _parse_path(path, delimiter):
+                current = current[index] if index is not None and isinstance(current, list) else current[key]
             return current
         except (KeyError, IndexError, TypeError):
             return None
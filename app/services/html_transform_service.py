@@ -1,16 +1,92 @@
-from typing import Dict, Any, List
-import xml.etree.ElementTree as ET
+from typing import Dict, Any, Callable, List, Optional
 try:
-    from bs4 import BeautifulSoup
+    # lxml builds and serializes element trees in C and can pretty-print natively
+    from lxml import etree as ET
+    LXML_ETREE = True
 except ImportError:
-    # Fallback if BeautifulSoup is not available
-    BeautifulSoup = None
+    import xml.etree.ElementTree as ET
+    LXML_ETREE = False
+from xml.sax.saxutils import escape
+try:
+    import lxml.html as lxml_html
+    from lxml import etree as lxml_etree
+    from lxml.cssselect import CSSSelector
+    from cssselect import SelectorError
+    HTML_PARSER = 'lxml'
+except ImportError:
+    # Fallback to BeautifulSoup with the pure-Python parser if lxml/cssselect are not available
+    lxml_html = None
+    HTML_PARSER = 'html.parser'
 import re
 from datetime import datetime
+from functools import lru_cache
 import logging
+from app.services.xml_utils import xml_text
 
 logger = logging.getLogger(__name__)
 
+if lxml_html is not None:
+    # Text nodes as BeautifulSoup's get_text() sees them (script/style/template content excluded)
+    _TEXT_XPATH = lxml_etree.XPath(
+        "descendant-or-self::text()[not(ancestor::script or ancestor::style or ancestor::template)]"
+    )
+    
+    @lru_cache(maxsize=256)
+    def _css_selector(selector: str) -> CSSSelector:
+        """Compile a CSS selector to XPath once per selector string"""
+        return CSSSelector(selector, translator='html')
+
+
+@lru_cache(maxsize=None)
+def _load_beautifulsoup():
+    """Import BeautifulSoup on first use; it is only needed when the lxml path cannot be used"""
+    try:
+        from bs4 import BeautifulSoup, SoupStrainer
+    except ImportError:
+        raise ImportError("BeautifulSoup4 is not installed. Please install it: pip install beautifulsoup4")
+    return BeautifulSoup, SoupStrainer
+
+
+@lru_cache(maxsize=256)
+def _soupsieve_selector(selector: str):
+    """Compile a CSS selector for BeautifulSoup trees once per selector string"""
+    import soupsieve
+    return soupsieve.compile(selector)
+
+
+# Selectors whose matches do not depend on ancestors or siblings, e.g. "a", "p.intro", "a[href]"
+_SIMPLE_SELECTOR_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9]*)(?:[.#][\w-]+|\[[^\]]*\])*$')
+
+# Patterns used per string leaf / per key, compiled once
+_WS_RE = re.compile(r'\s+')
+_TAG_RE = re.compile(r'<[^>]+>')
+_STRUCT_TAG_RE = re.compile(r'</(p|div|br)>')
+_SAFE_KEY_RE = re.compile(r'[^a-zA-Z0-9_-]')
+_PLZ_RE = re.compile(r'(\d{5})\s+(.+)')
+_TIME_RE = re.compile(r'(\d{1,2}:\d{2}).*?(\d{1,2}:\d{2})')
+_CLOCK_RE = re.compile(r'\d{1,2}:\d{2}')
+
+# Taifun field groups for O(1) membership tests
+_ADDRESS_SOURCE_FIELDS = frozenset({'location_address', 'address'})
+_TIME_RANGE_SOURCE_FIELDS = frozenset({'appointment_time', 'time_range'})
+_TAIFUN_MAPPED_KEYS = frozenset({
+    'problem_description', 'detailed_description', 'order_number',
+    'appointment_date', 'appointment_time_from', 'appointment_time_to',
+    'location_name', 'location_street', 'location_zip', 'location_city',
+    'technician', 'contact_person', 'contact_phone',
+})
+
+
+def _safe_xml_key(key: Any) -> str:
+    """Sanitize a dict key for use as XML tag name, skipping the substitution for already valid keys"""
+    key = str(key)
+    if _SAFE_KEY_RE.search(key):
+        key = _SAFE_KEY_RE.sub('_', key)
+    # XML names cannot be empty or start with a digit or '-'; lxml rejects them
+    if not key or not (key[0].isalpha() or key[0] == '_'):
+        key = '_' + key
+    return key
+
 
 class HTMLToXMLTransformService:
     """Service for transforming HTML to XML based on database rules"""
@@ -20,31 +96,38 @@ class HTMLToXMLTransformService:
         """Transform HTML content to XML based on provided rules"""
         
         try:
-            # Check if BeautifulSoup is available
-            if BeautifulSoup is None:
-                raise ImportError("BeautifulSoup4 is not installed. Please install it: pip install beautifulsoup4")
-            
-            # Parse HTML with BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
+            document = HTMLToXMLTransformService._parse_html(html_content, rules)
             
             # Initialize result data
             extracted_data = {}
+            # Selector results for this document, shared by all extract_elements rules
+            selection_cache = {}
+            # String transforms of consecutive text-processing rules, applied in one walk
+            pending_transforms = []
             
             # Process each rule in sequence
             for rule in rules:
                 action = rule.get("action")
                 
-                if action == "extract_text":
-                    extracted_data = HTMLToXMLTransformService._extract_text(soup, rule, extracted_data)
+                if action == "clean_whitespace":
+                    pending_transforms.append(HTMLToXMLTransformService._whitespace_transform(rule))
+                    continue
                 
-                elif action == "extract_elements":
-                    extracted_data = HTMLToXMLTransformService._extract_elements(soup, rule, extracted_data)
+                if action == "remove_html_tags":
+                    pending_transforms.append(HTMLToXMLTransformService._tag_transform(rule))
+                    continue
                 
-                elif action == "clean_whitespace":
-                    extracted_data = HTMLToXMLTransformService._clean_whitespace(extracted_data, rule)
+                if pending_transforms:
+                    extracted_data = HTMLToXMLTransformService._apply_leaf_transforms(extracted_data, pending_transforms)
+                    pending_transforms = []
                 
-                elif action == "remove_html_tags":
-                    extracted_data = HTMLToXMLTransformService._remove_html_tags(extracted_data, rule)
+                if action == "extract_text":
+                    extracted_data = HTMLToXMLTransformService._extract_text(document, rule, extracted_data)
+                
+                elif action == "extract_elements":
+                    extracted_data = HTMLToXMLTransformService._extract_elements(
+                        document, rule, extracted_data, selection_cache
+                    )
                 
                 elif action == "wrap_xml":
                     return HTMLToXMLTransformService._wrap_xml(extracted_data, rule)
@@ -58,6 +141,9 @@ class HTMLToXMLTransformService:
                 elif action == "build_taifun_xml":
                     return HTMLToXMLTransformService._build_taifun_xml(extracted_data, rule)
             
+            if pending_transforms:
+                extracted_data = HTMLToXMLTransformService._apply_leaf_transforms(extracted_data, pending_transforms)
+            
             # Default XML wrapping if no explicit wrap action
             return HTMLToXMLTransformService._default_xml_wrap(extracted_data)
             
@@ -67,17 +153,123 @@ class HTMLToXMLTransformService:
             return f'<error><message>Transformation failed: {str(e)}</message></error>'
     
     @staticmethod
-    def _extract_text(soup: Any, rule: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    def _parse_html(html_content: str, rules: List[Dict[str, Any]]) -> Any:
+        """Parse HTML into an lxml document, or a BeautifulSoup tree as fallback.
+        
+        lxml is used when it is installed and every selector in the rules compiles with
+        cssselect; otherwise BeautifulSoup/soupsieve handles the document.
+        """
+        if lxml_html is not None and HTMLToXMLTransformService._lxml_supports_rules(rules):
+            if not html_content.strip():
+                html_content = '<html></html>'
+            parser = lxml_html.HTMLParser(encoding='utf-8')
+            return lxml_html.document_fromstring(html_content.encode('utf-8'), parser=parser)
+        
+        # Check if BeautifulSoup is available
+        BeautifulSoup, SoupStrainer = _load_beautifulsoup()
+        
+        # Parse HTML with BeautifulSoup, keeping only the subtrees the rules can reach
+        strainer_tags = HTMLToXMLTransformService._strainer_tags(rules)
+        parse_only = SoupStrainer(list(strainer_tags)) if strainer_tags else None
+        return BeautifulSoup(html_content, HTML_PARSER, parse_only=parse_only)
+    
+    @staticmethod
+    def precompile_selectors(rules: List[Dict[str, Any]]) -> None:
+        """Compile the CSS selectors of a rule set ahead of its first document (e.g. when loading the rule)"""
+        if lxml_html is not None:
+            HTMLToXMLTransformService._lxml_supports_rules(rules)
+    
+    @staticmethod
+    def _lxml_supports_rules(rules: List[Dict[str, Any]]) -> bool:
+        """Check that cssselect can compile every selector used by the rules"""
+        for rule in rules:
+            if rule.get("action") == "extract_elements":
+                for selector in rule.get("selectors", {}).values():
+                    try:
+                        _css_selector(selector)
+                    except SelectorError:
+                        return False
+        return True
+    
+    @staticmethod
+    def _is_lxml(document: Any) -> bool:
+        """Check whether a parsed document/element comes from lxml rather than BeautifulSoup"""
+        return lxml_html is not None and isinstance(document, lxml_html.HtmlElement)
+    
+    @staticmethod
+    def _element_text(element: Any) -> str:
+        """Get stripped text of an element like BeautifulSoup's get_text(strip=True)"""
+        if HTMLToXMLTransformService._is_lxml(element):
+            return ''.join(text.strip() for text in _TEXT_XPATH(element))
+        return element.get_text(strip=True)
+    
+    @staticmethod
+    def _find(document: Any, tag_name: str) -> Any:
+        """Find the first element with the given tag name"""
+        if HTMLToXMLTransformService._is_lxml(document):
+            return next(document.iter(tag_name), None)
+        return document.find(tag_name)
+    
+    @staticmethod
+    def _select(document: Any, selector: str, selection_cache: Optional[Dict[str, list]] = None) -> list:
+        """Select all elements matching a CSS selector in document order.
+        
+        With a selection_cache (one per parsed document) each distinct selector walks the tree only once.
+        """
+        if selection_cache is not None and selector in selection_cache:
+            return selection_cache[selector]
+        
+        if HTMLToXMLTransformService._is_lxml(document):
+            elements = _css_selector(selector)(document)
+        else:
+            elements = _soupsieve_selector(selector).select(document)
+        
+        if selection_cache is not None:
+            selection_cache[selector] = elements
+        return elements
+    
+    @staticmethod
+    def _strainer_tags(rules: List[Dict[str, Any]]) -> Optional[set]:
+        """Collect the tag names the extraction rules can match.
+        
+        Returns None when the whole document is needed (body text, or a selector that
+        depends on ancestors/siblings), so parsing must not discard any subtree.
+        Straining keeps matched tags with all their descendants, so find/select on
+        the strained soup return the same elements as on the full document.
+        """
+        tags = set()
+        
+        for rule in rules:
+            action = rule.get("action")
+            
+            if action == "extract_text":
+                target = rule.get("target", "body")
+                if target == "body":
+                    return None
+                tags.add(target)
+            
+            elif action == "extract_elements":
+                for selector in rule.get("selectors", {}).values():
+                    for part in selector.split(','):
+                        match = _SIMPLE_SELECTOR_RE.match(part.strip())
+                        if not match:
+                            return None
+                        tags.add(match.group(1).lower())
+        
+        return tags or None
+    
+    @staticmethod
+    def _extract_text(document: Any, rule: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract text content from HTML"""
         target = rule.get("target", "body")
         output_key = rule.get("output", "content")
         max_length = rule.get("max_length")
         
         if target == "body":
-            text = soup.get_text(strip=True)
+            text = HTMLToXMLTransformService._element_text(document)
         else:
-            element = soup.find(target)
-            text = element.get_text(strip=True) if element else ""
+            element = HTMLToXMLTransformService._find(document, target)
+            text = HTMLToXMLTransformService._element_text(element) if element is not None else ""
         
         if max_length and len(text) > max_length:
             text = text[:max_length] + "..."
@@ -86,75 +278,80 @@ class HTMLToXMLTransformService:
         return data
     
     @staticmethod
-    def _extract_elements(soup: Any, rule: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    def _extract_elements(document: Any, rule: Dict[str, Any], data: Dict[str, Any],
+                          selection_cache: Optional[Dict[str, list]] = None) -> Dict[str, Any]:
         """Extract specific HTML elements based on selectors"""
         selectors = rule.get("selectors", {})
+        element_text = HTMLToXMLTransformService._element_text
         
         for key, selector in selectors.items():
-            elements = soup.select(selector)
+            elements = HTMLToXMLTransformService._select(document, selector, selection_cache)
             
             if key == "links":
                 # Special handling for links
                 data[key] = [
                     {
-                        "text": elem.get_text(strip=True),
+                        "text": element_text(elem),
                         "href": elem.get("href", "")
                     }
                     for elem in elements[:10]  # Limit to first 10
                 ]
             else:
                 # Extract text content
-                data[key] = [elem.get_text(strip=True) for elem in elements[:20]]  # Limit to first 20
+                data[key] = [element_text(elem) for elem in elements[:20]]  # Limit to first 20
         
         return data
     
     @staticmethod
-    def _clean_whitespace(data: Dict[str, Any], rule: Dict[str, Any]) -> Dict[str, Any]:
-        """Clean whitespace from text content"""
-        normalize = rule.get("normalize", True)
-        
-        def clean_text(text):
-            if isinstance(text, str):
-                if normalize:
-                    # Normalize whitespace
-                    return re.sub(r'\s+', ' ', text.strip())
-                else:
-                    return text.strip()
-            return text
-        
-        def clean_recursive(obj):
-            if isinstance(obj, dict):
-                return {k: clean_recursive(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [clean_recursive(item) for item in obj]
-            else:
-                return clean_text(obj)
-        
-        return clean_recursive(data)
+    def _whitespace_transform(rule: Dict[str, Any]) -> Callable[[str], str]:
+        """Build the string transform for a clean_whitespace rule"""
+        if rule.get("normalize", True):
+            # Normalize whitespace
+            return lambda text: _WS_RE.sub(' ', text.strip())
+        return str.strip
     
     @staticmethod
-    def _remove_html_tags(data: Dict[str, Any], rule: Dict[str, Any]) -> Dict[str, Any]:
-        """Remove HTML tags from content"""
-        preserve_structure = rule.get("preserve_structure", False)
-        
-        def remove_tags(text):
-            if isinstance(text, str):
-                if preserve_structure:
-                    # Replace some tags with newlines
-                    text = re.sub(r'</(p|div|br)>', '\n', text)
-                # Remove all HTML tags
-                return re.sub(r'<[^>]+>', '', text)
-            return text
-        
-        def process_recursive(obj):
-            if isinstance(obj, dict):
-                return {k: process_recursive(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [process_recursive(item) for item in obj]
-            else:
-                return remove_tags(obj)
+    def _tag_transform(rule: Dict[str, Any]) -> Callable[[str], str]:
+        """Build the string transform for a remove_html_tags rule"""
+        if rule.get("preserve_structure", False):
+            # Replace some tags with newlines, then remove all HTML tags
+            return lambda text: _TAG_RE.sub('', _STRUCT_TAG_RE.sub('\n', text))
+        # Remove all HTML tags
+        return lambda text: _TAG_RE.sub('', text)
+    
+    @staticmethod
+    def _apply_leaf_transforms(data: Any, transforms: List[Callable[[str], str]]) -> Any:
+        """Apply string transforms in order to every string leaf of nested dicts/lists.
+        
+        Consecutive text-processing rules are fused into this single walk. Containers are
+        updated in place using an explicit stack instead of recursion, and only leaves the
+        transforms actually changed are written back.
+        """
+        if isinstance(data, str):
+            for transform in transforms:
+                data = transform(data)
+            return data
+        if not isinstance(data, (dict, list)):
+            return data
+        
+        stack = [data]
+        while stack:
+            container = stack.pop()
+            entries = container.items() if isinstance(container, dict) else enumerate(container)
+            for key, value in entries:
+                # One type() lookup per leaf; extracted data only holds plain str/dict/list/scalars
+                value_type = type(value)
+                if value_type is str:
+                    new_value = value
+                    for transform in transforms:
+                        new_value = transform(new_value)
+                    # re.sub and str.strip return the same object when nothing changed
+                    if new_value is not value:
+                        container[key] = new_value
+                elif value_type is dict or value_type is list:
+                    stack.append(value)
         
-        return process_recursive(data)
+        return data
     
     @staticmethod
     def _wrap_xml(data: Dict[str, Any], rule: Dict[str, Any]) -> str:
@@ -177,14 +374,14 @@ class HTMLToXMLTransformService:
                         content = data.get("content", "")
                         value = str(len(str(content)))
                 
-                meta_elem = ET.SubElement(metadata_elem, key)
-                meta_elem.text = str(value)
+                meta_elem = ET.SubElement(metadata_elem, _safe_xml_key(key))
+                meta_elem.text = xml_text(value)
         
         # Add content
         if isinstance(data, dict) and len(data) == 1 and content_element in data:
             # Simple content wrapping
             content_elem = ET.SubElement(root, content_element)
-            content_elem.text = str(data[content_element])
+            content_elem.text = xml_text(data[content_element])
         else:
             # Add all data elements
             HTMLToXMLTransformService._dict_to_xml(data, root)
@@ -199,7 +396,7 @@ class HTMLToXMLTransformService:
         
         def build_recursive(struct, data_source, parent):
             for key, value in struct.items():
-                elem = ET.SubElement(parent, key)
+                elem = ET.SubElement(parent, _safe_xml_key(key))
                 
                 if isinstance(value, dict):
                     # Nested structure
@@ -214,9 +411,9 @@ class HTMLToXMLTransformService:
                                 if isinstance(item, dict):
                                     HTMLToXMLTransformService._dict_to_xml(item, item_elem)
                                 else:
-                                    item_elem.text = str(item)
+                                    item_elem.text = xml_text(item)
                         else:
-                            elem.text = str(content)
+                            elem.text = xml_text(content)
         
         # Find root element
         root_key = list(structure.keys())[0]
@@ -230,38 +427,86 @@ class HTMLToXMLTransformService:
     @staticmethod
     def _default_xml_wrap(data: Dict[str, Any]) -> str:
         """Default XML wrapping for data"""
+        flat_xml = HTMLToXMLTransformService._flat_dict_to_xml_string(data, "document")
+        if flat_xml is not None:
+            return flat_xml
+        
         root = ET.Element("document")
         HTMLToXMLTransformService._dict_to_xml(data, root)
         return HTMLToXMLTransformService._xml_to_string(root)
     
     @staticmethod
-    def _dict_to_xml(data: Dict[str, Any], parent: ET.Element):
-        """Convert dictionary to XML elements"""
+    def _flat_dict_to_xml_string(data: Dict[str, Any], root_element: str) -> Optional[str]:
+        """Serialize a flat dict (scalars and lists of scalars) without building an element tree.
+        
+        Returns None for empty or nested data so the caller can fall back to ElementTree.
+        """
+        if not data:
+            return None
+        
+        # Mirror the element tree serializer: lxml pretty-prints and keeps empty text as an open/close pair
+        if LXML_ETREE:
+            indent, no_text, empty_text = '  ', '<{0}/>', '<{0}></{0}>'
+        else:
+            indent, no_text, empty_text = '  ', '<{0} />', '<{0} />'
+        
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>', f'<{root_element}>']
         for key, value in data.items():
-            # Sanitize key name for XML
-            safe_key = re.sub(r'[^a-zA-Z0-9_-]', '_', str(key))
-            elem = ET.SubElement(parent, safe_key)
-            
             if isinstance(value, dict):
-                HTMLToXMLTransformService._dict_to_xml(value, elem)
-            elif isinstance(value, list):
+                return None
+            
+            safe_key = _safe_xml_key(key)
+            if isinstance(value, list):
+                if not value:
+                    parts.append(indent + no_text.format(safe_key))
+                    continue
+                parts.append(f'{indent}<{safe_key}>')
                 for item in value:
-                    item_elem = ET.SubElement(elem, "item")
                     if isinstance(item, dict):
-                        HTMLToXMLTransformService._dict_to_xml(item, item_elem)
-                    else:
-                        item_elem.text = str(item)
+                        return None
+                    text = xml_text(item)
+                    parts.append(indent * 2 + (f'<item>{escape(text)}</item>' if text else empty_text.format('item')))
+                parts.append(f'{indent}</{safe_key}>')
             else:
-                elem.text = str(value)
+                text = xml_text(value)
+                parts.append(indent + (f'<{safe_key}>{escape(text)}</{safe_key}>' if text else empty_text.format(safe_key)))
+        parts.append(f'</{root_element}>')
+        
+        return '\n'.join(parts)
+    
+    @staticmethod
+    def _dict_to_xml(data: Dict[str, Any], parent: ET.Element):
+        """Convert dictionary to XML elements (iteratively, so deep data cannot hit the recursion limit)"""
+        stack = [(parent, data)]
+        while stack:
+            parent_elem, current = stack.pop()
+            for key, value in current.items():
+                # Sanitize key name for XML
+                safe_key = _safe_xml_key(key)
+                elem = ET.SubElement(parent_elem, safe_key)
+                
+                if isinstance(value, dict):
+                    stack.append((elem, value))
+                elif isinstance(value, list):
+                    for item in value:
+                        item_elem = ET.SubElement(elem, "item")
+                        if isinstance(item, dict):
+                            stack.append((item_elem, item))
+                        else:
+                            item_elem.text = xml_text(item)
+                else:
+                    elem.text = xml_text(value)
     
     @staticmethod
     def _xml_to_string(element: ET.Element) -> str:
         """Convert XML element to formatted string"""
-        # Create string representation
-        rough_string = ET.tostring(element, encoding='unicode')
-        
-        # Basic formatting (add newlines)
-        formatted = rough_string.replace('><', '>\n<')
+        if LXML_ETREE:
+            # Native pretty-printing; the declaration is prepended below in its double-quoted form
+            formatted = ET.tostring(element, pretty_print=True, encoding='unicode').rstrip('\n')
+        else:
+            # Indent the tree itself instead of rescanning the serialized document
+            ET.indent(element, space='  ')
+            formatted = ET.tostring(element, encoding='unicode')
         
         return f'<?xml version="1.0" encoding="UTF-8"?>\n{formatted}'
     
@@ -272,8 +517,8 @@ class HTMLToXMLTransformService:
         mapped_data = {}
         
         for source_field, target_fields in field_mapping.items():
-            if source_field in data and data[source_field]:
-                source_value = data[source_field]
+            source_value = data.get(source_field)
+            if source_value:
                 
                 # Behandle verschiedene Target-Field-Typen
                 if isinstance(target_fields, str):
@@ -281,12 +526,12 @@ class HTMLToXMLTransformService:
                     mapped_data[target_fields] = source_value
                 elif isinstance(target_fields, list):
                     # Mehrere Zielfelder (z.B. für Adressdaten)
-                    if source_field in ['location_address', 'address']:
+                    if source_field in _ADDRESS_SOURCE_FIELDS:
                         # Spezielle Behandlung für Adressen
                         HTMLToXMLTransformService._parse_address_to_fields(
                             source_value, target_fields, mapped_data
                         )
-                    elif source_field in ['appointment_time', 'time_range']:
+                    elif source_field in _TIME_RANGE_SOURCE_FIELDS:
                         # Spezielle Behandlung für Zeitspannen
                         HTMLToXMLTransformService._parse_time_range_to_fields(
                             source_value, target_fields, mapped_data
@@ -316,7 +561,7 @@ class HTMLToXMLTransformService:
         if len(address_parts) >= 2:
             # Versuche PLZ und Ort zu extrahieren
             plz_ort = address_parts[-1].strip()
-            plz_match = re.match(r'(\d{5})\s+(.+)', plz_ort)
+            plz_match = _PLZ_RE.match(plz_ort)
             if plz_match:
                 if 'MtAnschriftPLZ' in target_fields:
                     mapped_data['MtAnschriftPLZ'] = plz_match.group(1)
@@ -327,14 +572,20 @@ class HTMLToXMLTransformService:
     def _parse_time_range_to_fields(time_range: str, target_fields: List[str], mapped_data: Dict[str, Any]):
         """Parst eine Zeitspanne in Von/Bis-Felder"""
         # Beispiele: "13:00-15:00", "13:00 bis 15:00", "von 13:00 bis 15:00"
-        time_pattern = r'(\d{1,2}:\d{2}).*?(\d{1,2}:\d{2})'
-        match = re.search(time_pattern, time_range)
+        # Schneller Pfad für das häufige Format "HH:MM-HH:MM" ohne Regex-Suche
+        time_from, separator, time_to = time_range.partition('-')
+        time_from, time_to = time_from.strip(), time_to.strip()
+        if separator and _CLOCK_RE.fullmatch(time_from) and _CLOCK_RE.fullmatch(time_to):
+            times = (time_from, time_to)
+        else:
+            match = _TIME_RE.search(time_range)
+            times = match.groups() if match else None
         
-        if match:
+        if times:
             if 'TimeVon' in target_fields:
-                mapped_data['TimeVon'] = f"{match.group(1)}:00"
+                mapped_data['TimeVon'] = f"{times[0]}:00"
             if 'TimeBis' in target_fields:
-                mapped_data['TimeBis'] = f"{match.group(2)}:00"
+                mapped_data['TimeBis'] = f"{times[1]}:00"
         else:
             # Fallback: gesamten String als TimeVon verwenden
             if 'TimeVon' in target_fields:
@@ -369,12 +620,7 @@ class HTMLToXMLTransformService:
             'MaMatch': data.get('technician', ''),
         }
         
-        for field_name, value in taifun_fields.items():
-            if value:  # Nur nicht-leere Werte hinzufügen
-                field_elem = ET.SubElement(work_order, field_name)
-                field_elem.text = str(value)
-        
-        # Kontaktdaten falls vorhanden
+        # Kontaktdaten falls vorhanden - vor dem Erzeugen der Elemente zu VortextTxt hinzufügen
         if data.get('contact_person') or data.get('contact_phone'):
             contact_info = []
             if data.get('contact_person'):
@@ -382,26 +628,19 @@ class HTMLToXMLTransformService:
             if data.get('contact_phone'):
                 contact_info.append(f"Telefon: {data['contact_phone']}")
             
-            # Zu VortextTxt hinzufügen
-            current_vortext = taifun_fields.get('VortextTxt', '')
-            enhanced_vortext = current_vortext + '\n' + '\n'.join(contact_info)
-            
-            vortext_elem = work_order.find('VortextTxt')
-            if vortext_elem is not None:
-                vortext_elem.text = enhanced_vortext
-            else:
-                vortext_elem = ET.SubElement(work_order, 'VortextTxt')
-                vortext_elem.text = enhanced_vortext
+            taifun_fields['VortextTxt'] = '\n'.join([taifun_fields['VortextTxt'], *contact_info])
+        
+        for field_name, value in taifun_fields.items():
+            if value:  # Nur nicht-leere Werte hinzufügen
+                field_elem = ET.SubElement(work_order, field_name)
+                field_elem.text = xml_text(value)
         
         # Zusätzliche extrahierte Daten
         if len(data) > len(taifun_fields):
             additional = ET.SubElement(root, "AdditionalData")
             for key, value in data.items():
-                if key not in ['problem_description', 'detailed_description', 'order_number', 
-                              'appointment_date', 'appointment_time_from', 'appointment_time_to',
-                              'location_name', 'location_street', 'location_zip', 'location_city',
-                              'technician', 'contact_person', 'contact_phone']:
-                    elem = ET.SubElement(additional, key.replace(' ', '_'))
-                    elem.text = str(value)
+                if key not in _TAIFUN_MAPPED_KEYS:
+                    elem = ET.SubElement(additional, _safe_xml_key(key))
+                    elem.text = xml_text(value)
         
         return HTMLToXMLTransformService._xml_to_string(root)
@@ -1,11 +1,285 @@
-from playwright.async_api import async_playwright, Browser
-from typing import Optional, Dict, Any
+from playwright.async_api import async_playwright, Browser, Page, Route
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable, FrozenSet, List, Set
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import re
 from datetime import datetime
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Characters of body text returned by extract_from_url
+_TEXT_PREVIEW_CHARS = 1000
+
+# Bounds for the table data of the work order extraction, applied in the page before crossing CDP
+_TABLE_LIMITS = {"tables": 3, "rows": 50, "cells": 20, "cellChars": 500}
+
+# Resource types extraction never needs; stylesheets are only blocked when configured,
+# since innerText and class-based detection depend on them
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+
+
+def _resource_blocker(blocked_types: FrozenSet[str]) -> Callable[[Route], Awaitable[None]]:
+    """Route handler aborting requests of the given resource types, letting everything else through"""
+    async def block(route: Route):
+        if route.request.resource_type in blocked_types:
+            await route.abort()
+        else:
+            await route.continue_()
+    return block
+
+
+_block_heavy_resources = _resource_blocker(_BLOCKED_RESOURCE_TYPES)
+
+
+# Collects title, body text, custom selector texts and the optional meta tags/links of a page
+# in a single evaluate call. Selectors document.querySelector cannot parse (e.g. Playwright's
+# text=/xpath= engines) are reported back in `unsupported`.
+_PAGE_SUMMARY_JS = """
+    ({ textLimit, extractMeta, extractLinks, selectors }) => {
+        const text = document.body ? document.body.innerText : '';
+        const truncated = text.length > textLimit;
+        const summary = {
+            title: document.title,
+            // Truncate in the page so only the preview crosses the wire
+            text: truncated ? text.slice(0, textLimit) + '...' : text,
+            truncated,
+            custom: null,
+            unsupported: [],
+            meta: null,
+            links: null
+        };
+        
+        if (selectors) {
+            summary.custom = {};
+            for (const [key, selector] of Object.entries(selectors)) {
+                let element;
+                try {
+                    element = document.querySelector(selector);
+                } catch (e) {
+                    summary.unsupported.push(key);
+                    continue;
+                }
+                if (element) {
+                    summary.custom[key] = element.innerText;
+                }
+            }
+        }
+        
+        if (extractMeta) {
+            summary.meta = {};
+            document.querySelectorAll('meta').forEach(meta => {
+                const name = meta.getAttribute('name') || meta.getAttribute('property');
+                const content = meta.getAttribute('content');
+                if (name && content) {
+                    summary.meta[name] = content;
+                }
+            });
+        }
+        
+        if (extractLinks) {
+            summary.links = Array.from(document.querySelectorAll('a[href]')).map(link => ({
+                text: link.innerText.trim(),
+                href: link.href
+            })).filter(link => link.text && link.href);
+        }
+        
+        return summary;
+    }
+"""
+
+
+# innerText of the first match per {field: selector} in one evaluate call; selectors
+# document.querySelector cannot parse are reported in `unsupported` like above
+_SELECTOR_TEXTS_JS = """
+    (selectors) => {
+        const texts = {};
+        const unsupported = [];
+        for (const [key, selector] of Object.entries(selectors)) {
+            try {
+                const element = document.querySelector(selector);
+                texts[key] = element ? element.innerText : null;
+            } catch (e) {
+                unsupported.push(key);
+            }
+        }
+        return { texts, unsupported };
+    }
+"""
+
+# CSS selectors tried in order for each work order field by the intelligent extraction
+_WORK_ORDER_SELECTORS = {
+    "problem": [
+        '[class*="problem"]', '[class*="beschreibung"]', '[class*="schaden"]',
+        '[class*="meldung"]', '[class*="info"]', '[id*="problem"]',
+        '[id*="beschreibung"]', 'textarea', '.description'
+    ],
+    "order": [
+        '[class*="order"]', '[class*="auftrag"]', '[class*="bestell"]',
+        '[class*="referenz"]', '[id*="order"]', '[id*="nummer"]'
+    ],
+    "date": [
+        '[class*="termin"]', '[class*="date"]', '[class*="datum"]',
+        'input[type="date"]', '[id*="termin"]', '[id*="date"]'
+    ],
+    "time": [
+        '[class*="zeit"]', '[class*="time"]', '[class*="uhr"]',
+        'input[type="time"]', '[id*="zeit"]', '[id*="time"]'
+    ],
+    "location": [
+        '[class*="standort"]', '[class*="objekt"]', '[class*="location"]',
+        '[class*="adresse"]', '[id*="standort"]', '[id*="objekt"]'
+    ],
+    "contact": [
+        '[class*="kontakt"]', '[class*="ansprech"]', '[class*="meldender"]',
+        '[class*="contact"]', '[id*="kontakt"]', '[id*="contact"]'
+    ],
+}
+
+# Intelligente Extraktion der Auftragsfelder anhand von _WORK_ORDER_SELECTORS
+_WORK_ORDER_JS = """
+    (selectors, tableLimits) => {
+        const data = {};
+        
+        // Erstes Element je Selektor in einem einzigen DOM-Durchlauf über den kombinierten Selektor finden
+        const allSelectors = [...new Set(Object.values(selectors).flat())];
+        const firstMatch = new Map();
+        for (const element of document.querySelectorAll(allSelectors.join(','))) {
+            for (const selector of allSelectors) {
+                if (!firstMatch.has(selector) && element.matches(selector)) {
+                    firstMatch.set(selector, element);
+                }
+            }
+            if (firstMatch.size === allSelectors.length) break;
+        }
+        
+        // Selektoren einer Gruppe der Reihe nach prüfen, der erste brauchbare Treffer gewinnt
+        const pick = (group, valueOf) => {
+            for (const selector of selectors[group]) {
+                const element = firstMatch.get(selector);
+                const value = element ? valueOf(element) : null;
+                if (value) return value;
+            }
+            return null;
+        };
+        const trimmedText = (minLength) => (element) => {
+            const text = element.innerText.trim();
+            return text.length > minLength ? text : null;
+        };
+        // Texte der Treffer einer Gruppe in Selektor-Reihenfolge; die Muster prüft Python
+        const candidateTexts = (group, withValue) => selectors[group]
+            .map((selector) => firstMatch.get(selector))
+            .filter(Boolean)
+            .map((element) => (withValue ? element.innerText || element.value : element.innerText) || '');
+        const candidates = {
+            // Auftragsnummer/Bestellnummer
+            order: candidateTexts('order', false),
+            // Termininformationen
+            date: candidateTexts('date', true),
+            // Zeitangaben
+            time: candidateTexts('time', true)
+        };
+        
+        const fields = {
+            // Problem-/Schadensbeschreibung
+            problem_description: pick('problem', trimmedText(10)),
+            // Standort/Objekt
+            location_name: pick('location', trimmedText(5)),
+            // Kontaktperson
+            contact_person: pick('contact', trimmedText(3))
+        };
+        for (const [field, value] of Object.entries(fields)) {
+            if (value) data[field] = value;
+        }
+        
+        // Suche nach Telefonnummer
+        const phonePattern = /\\+?[\\d\\s\\-\\(\\)]{8,}/;
+        const allText = document.body.innerText;
+        const phoneMatch = allText.match(phonePattern);
+        if (phoneMatch) {
+            data.contact_phone = phoneMatch[0].trim();
+        }
+        
+        // Sammle Tabellendaten (oft enthalten strukturierte Informationen), begrenzt auf
+        // die ersten Tabellen, Zeilen und Zellen, damit große Tabellen nicht komplett übertragen werden
+        const tables = document.querySelectorAll('table');
+        if (tables.length > 0) {
+            data.table_data = [];
+            for (const table of [...tables].slice(0, tableLimits.tables)) {
+                const rows = [];
+                for (const row of table.querySelectorAll('tr')) {
+                    if (rows.length >= tableLimits.rows) break;
+                    const cells = [...row.querySelectorAll('td, th')]
+                        .slice(0, tableLimits.cells)
+                        .map(cell => cell.innerText.trim().slice(0, tableLimits.cellChars));
+                    if (cells.length > 0) rows.push(cells);
+                }
+                if (rows.length > 0) data.table_data.push(rows);
+            }
+        }
+        
+        return { data, candidates };
+    }
+"""
+
+# Muster der Felder, für die die Extraktion nur Kandidatentexte liefert: (Feld, Selektor-Gruppe, Muster)
+_WORK_ORDER_PATTERN_FIELDS = (
+    ("order_number", "order", re.compile(r'[A-Z]?\d{6,}', re.ASCII)),
+    ("appointment_date", "date", re.compile(r'\d{1,2}\.\d{1,2}\.\d{4}|\d{4}-\d{2}-\d{2}', re.ASCII)),
+    ("appointment_time", "time", re.compile(r'\d{1,2}:\d{2}.*?\d{1,2}:\d{2}|\d{1,2}:\d{2}', re.ASCII)),
+)
+
+# Website-Typ und CMS erkennen
+_DETECT_SITE_JS = """
+    () => {
+        const analysis = {
+            has_forms: document.querySelectorAll('form').length > 0,
+            has_tables: document.querySelectorAll('table').length > 0,
+            has_cms_indicators: false,
+            likely_cms: 'unknown',
+            form_count: document.querySelectorAll('form').length,
+            table_count: document.querySelectorAll('table').length,
+            input_count: document.querySelectorAll('input').length
+        };
+        
+        // CMS-Erkennung
+        const bodyClasses = document.body.className.toLowerCase();
+        const headContent = document.head.innerHTML.toLowerCase();
+        
+        if (bodyClasses.includes('wordpress') || headContent.includes('wp-content')) {
+            analysis.likely_cms = 'wordpress';
+            analysis.has_cms_indicators = true;
+        } else if (bodyClasses.includes('drupal') || headContent.includes('drupal')) {
+            analysis.likely_cms = 'drupal';
+            analysis.has_cms_indicators = true;
+        } else if (headContent.includes('typo3')) {
+            analysis.likely_cms = 'typo3';
+            analysis.has_cms_indicators = true;
+        }
+        
+        return analysis;
+    }
+"""
+
+# Scroll helpers for the scroll steps of URL instructions (ExtractService)
+_SCROLL_HELPERS_JS = """
+window.__scroll_down_end = () => window.scrollTo(0, document.body.scrollHeight);
+window.__scroll_up_top = () => window.scrollTo(0, 0);
+window.__scroll_by = (n) => window.scrollBy(0, n);
+"""
+
+# All page scripts above, installed once per pooled context as init script so every page
+# exposes them as window.__czisch.* and a call only sends a short invocation over CDP
+_EXTRACTION_BUNDLE_JS = f"""
+window.__czisch = {{
+    pageSummary: {_PAGE_SUMMARY_JS.strip()},
+    selectorTexts: {_SELECTOR_TEXTS_JS.strip()},
+    extractWorkOrder: {_WORK_ORDER_JS.strip()},
+    detectSite: {_DETECT_SITE_JS.strip()}
+}};
+{_SCROLL_HELPERS_JS.strip()}
+"""
 
 class PlaywrightService:
     """Service for managing Playwright browser instances and web automation"""
@@ -13,283 +287,293 @@ class PlaywrightService:
     def __init__(self):
         self.playwright = None
         self.browser: Optional[Browser] = None
+        self._browsers: List[Browser] = []
+        # Pre-warmed pages, one per browser context, each handed out to a single request; the
+        # semaphore bounds concurrent pages to the pool size per browser
+        self._pages: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pool_size = 0
+        self._next_browser = 0
+        self._block_resources: Optional[Callable[[Route], Awaitable[None]]] = None
+        # Running context replacements; referenced here so they are not garbage-collected
+        self._recycle_tasks: Set[asyncio.Task] = set()
         
     async def start(self):
-        """Initialize Playwright and browser"""
+        """Initialize Playwright and browsers"""
         try:
             self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=settings.playwright_headless
-            )
-            logger.info("Playwright browser initialized successfully")
+            for _ in range(max(1, settings.playwright_browser_count)):
+                self._browsers.append(await self.playwright.chromium.launch(
+                    headless=settings.playwright_headless
+                ))
+            self.browser = self._browsers[0]
+            
+            # Every page of a context skips images, fonts, media (and optionally CSS)
+            blocked_types = _BLOCKED_RESOURCE_TYPES
+            if settings.playwright_block_stylesheets:
+                blocked_types = blocked_types | {"stylesheet"}
+            self._block_resources = _resource_blocker(blocked_types)
+            
+            # Interleave the contexts so consecutive requests are spread round-robin over the browsers
+            self._pool_size = max(1, settings.playwright_context_pool_size) * len(self._browsers)
+            self._slots = asyncio.Semaphore(self._pool_size)
+            self._pages = asyncio.Queue()
+            for _ in range(max(1, settings.playwright_context_pool_size)):
+                for browser in self._browsers:
+                    self._pages.put_nowait(await self._new_pooled_page(browser))
+            logger.info(f"Playwright initialized successfully with {len(self._browsers)} browser(s)")
         except Exception as e:
             logger.error(f"Failed to initialize Playwright: {e}")
             # Don't raise the exception to allow the service to start without Playwright
             # The API will still work for non-web-scraping endpoints
             logger.warning("API will continue without Playwright functionality")
+            try:
+                # Close the contexts, browsers and driver started before the failure
+                await self.stop()
+            except Exception as cleanup_error:
+                logger.warning(f"Failed to clean up partially started Playwright: {cleanup_error}")
             self.browser = None
+            self._browsers = []
+            self._pages = None
+            self._slots = None
+            self.playwright = None
     
     async def stop(self):
         """Clean up Playwright resources"""
-        if self.browser:
-            await self.browser.close()
-            logger.info("Playwright browser closed")
+        pages, self._pages = self._pages, None
+        self._slots = None
+        # Context replacements still running would only open contexts of browsers closed below
+        tasks = list(self._recycle_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if pages is not None:
+            while not pages.empty():
+                await pages.get_nowait().context.close()
+        for browser in self._browsers:
+            await browser.close()
+        if self._browsers:
+            logger.info(f"Playwright browsers closed ({len(self._browsers)})")
+        self._browsers = []
+        self.browser = None
         if self.playwright:
-            await self.playwright.stop()
+            playwright, self.playwright = self.playwright, None
+            await playwright.stop()
+    
+    @asynccontextmanager
+    async def new_page(self) -> AsyncIterator[Page]:
+        """Take a pre-warmed page for one request; its context is replaced in the background afterwards"""
+        if not self.browser or self._pages is None:
+            raise RuntimeError("Playwright browser not initialized")
+        
+        pages, slots = self._pages, self._slots
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=settings.playwright_pool_timeout / 1000)
+        except asyncio.TimeoutError:
+            raise RuntimeError("No pooled browser page became available in time")
+        page = None
+        try:
+            if not pages.empty():
+                page = pages.get_nowait()
+            else:
+                # Replacement still running (or failed): open this request's context now
+                browser = self._browsers[self._next_browser % len(self._browsers)]
+                self._next_browser += 1
+                page = await self._new_pooled_page(browser)
+            yield page
+        finally:
+            # Synchronous, so a cancelled request cannot lose its slot or put the used page back
+            slots.release()
+            if page is not None:
+                task = asyncio.get_running_loop().create_task(self._recycle_page(page, pages))
+                self._recycle_tasks.add(task)
+                task.add_done_callback(self._recycle_tasks.discard)
+    
+    async def _new_pooled_page(self, browser: Browser) -> Page:
+        """Open a browser context with the extraction scripts and resource blocking, and its page"""
+        context = await browser.new_context()
+        await context.add_init_script(_EXTRACTION_BUNDLE_JS)
+        await context.route("**/*", self._block_resources)
+        return await context.new_page()
+    
+    async def _recycle_page(self, page: Page, pages: asyncio.Queue):
+        """Close a used page's browser context and add a fresh context's page to the pool
+        
+        Closing the context drops cookies, local/session storage, IndexedDB, HTTP cache and service
+        workers, so no state carries over between requests (as with the former browser.new_page()).
+        """
+        context = page.context
+        browser = context.browser
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"Failed to close used browser context: {e}")
+        if self._pages is not pages:
+            return  # stopped meanwhile
+        try:
+            fresh_page = await self._new_pooled_page(browser)
+        except Exception as e:
+            # The next request without a pre-warmed page opens its context itself
+            logger.warning(f"Failed to pre-warm browser context: {e}")
+            return
+        if self._pages is pages and pages.qsize() < self._pool_size:
+            pages.put_nowait(fresh_page)
+        else:
+            await fresh_page.context.close()
+    
+    async def _goto(self, page: Page, url: str, wait_until: Optional[str] = None,
+                    wait_for_selector: Optional[str] = None):
+        """Navigate until the DOM is ready; JS-rendered pages can wait for a selector instead of the load event"""
+        await page.goto(url, timeout=settings.playwright_timeout,
+                        wait_until=wait_until or settings.playwright_wait_until)
+        if wait_for_selector:
+            await page.wait_for_selector(wait_for_selector, timeout=settings.playwright_timeout)
     
     async def extract_from_url(self, url: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Extract data from a URL using Playwright"""
         if not self.browser:
             raise RuntimeError("Playwright browser not initialized")
         
-        page = await self.browser.new_page()
-        try:
-            await page.goto(url, timeout=settings.playwright_timeout)
+        config = config or {}
+        async with self.new_page() as page:
+            await self._goto(page, url, config.get("wait_until"), config.get("wait_for_selector"))
+            return await self._extract_from_page(page, url, config)
+    
+    async def _extract_from_page(self, page: Page, url: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Extract title, text and configured selectors from an already loaded page"""
+        # Default extraction: title, text content and requested meta tags/links in one round-trip
+        summary = await page.evaluate("(options) => window.__czisch.pageSummary(options)", {
+            "textLimit": _TEXT_PREVIEW_CHARS,
+            "extractMeta": bool(config and config.get("extract_meta", False)),
+            "extractLinks": bool(config and config.get("extract_links", False)),
+            "selectors": config.get("selectors") if config else None,
+        })
+        result = {
+            "title": summary["title"],
+            "text_content": summary["text"],
+            "text_truncated": summary["truncated"],
+            "url": url
+        }
+        
+        # Advanced extraction based on config
+        if config and "selectors" in config:
+            custom_data = summary["custom"] or {}
+            unsupported = set(summary["unsupported"])
             
-            # Default extraction: get page title and text content
-            title = await page.title()
-            text_content = await page.evaluate("document.body.innerText")
+            # Only Playwright-specific selectors need their own round-trips
+            for key in unsupported:
+                selector = config["selectors"][key]
+                try:
+                    element = await page.query_selector(selector)
+                    if element:
+                        custom_data[key] = await element.inner_text()
+                except Exception as e:
+                    logger.warning(f"Failed to extract selector {selector}: {e}")
+                    custom_data[key] = None
             
-            result = {
-                "title": title,
-                "text_content": text_content[:1000] + "..." if len(text_content) > 1000 else text_content,
-                "url": url
+            # Keep the order of the configured selectors
+            result["custom_extractions"] = {
+                key: custom_data[key] for key in config["selectors"] if key in custom_data
             }
-            
-            # Advanced extraction based on config
-            if config and "selectors" in config:
-                custom_data = {}
-                for key, selector in config["selectors"].items():
-                    try:
-                        element = await page.query_selector(selector)
-                        if element:
-                            custom_data[key] = await element.inner_text()
-                    except Exception as e:
-                        logger.warning(f"Failed to extract selector {selector}: {e}")
-                        custom_data[key] = None
-                
-                result["custom_extractions"] = custom_data
-            
-            # Extract meta tags if requested
-            if config and config.get("extract_meta", False):
-                meta_tags = await page.evaluate("""
-                    () => {
-                        const metas = {};
-                        document.querySelectorAll('meta').forEach(meta => {
-                            const name = meta.getAttribute('name') || meta.getAttribute('property');
-                            const content = meta.getAttribute('content');
-                            if (name && content) {
-                                metas[name] = content;
-                            }
-                        });
-                        return metas;
-                    }
-                """)
-                result["meta_tags"] = meta_tags
-            
-            # Extract links if requested
-            if config and config.get("extract_links", False):
-                links = await page.evaluate("""
-                    () => {
-                        return Array.from(document.querySelectorAll('a[href]')).map(link => ({
-                            text: link.innerText.trim(),
-                            href: link.href
-                        })).filter(link => link.text && link.href);
-                    }
-                """)
-                result["links"] = links[:50]  # Limit to first 50 links
-            
-            return result
-            
-        finally:
-            await page.close()
+        
+        # Extract meta tags if requested
+        if summary["meta"] is not None:
+            result["meta_tags"] = summary["meta"]
+        
+        # Extract links if requested
+        if summary["links"] is not None:
+            result["links"] = summary["links"][:50]  # Limit to first 50 links
+        
+        return result
     
-    async def extract_work_order_data(self, url: str, custom_selectors: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    async def extract_work_order_data(self, url: str, custom_selectors: Optional[Dict[str, str]] = None,
+                                      include_html: bool = False) -> Dict[str, Any]:
         """
         Spezielle Extraktion für Auftragsdaten mit intelligenter Felderkennung
         
         Args:
             url: Die URL der Auftragsseite
             custom_selectors: Optional - spezifische CSS-Selektoren für bekannte Websites
+            include_html: Optional - vollständiges HTML der Seite als page_html mitliefern
         """
         if not self.browser:
             raise RuntimeError("Playwright browser not initialized")
         
-        page = await self.browser.new_page()
         try:
-            await page.goto(url, timeout=settings.playwright_timeout)
-            
-            # Basis-Informationen sammeln
-            result = {
-                "url": url,
-                "title": await page.title(),
-                "extraction_timestamp": datetime.now().isoformat()
-            }
-            
-            # Verwende custom selectors falls vorhanden
-            if custom_selectors:
-                logger.info("Using custom selectors for work order extraction")
-                for field_name, selector in custom_selectors.items():
-                    try:
-                        element = await page.query_selector(selector)
-                        if element:
-                            result[field_name] = await element.inner_text()
-                        else:
-                            logger.warning(f"Selector '{selector}' for field '{field_name}' found no elements")
-                    except Exception as e:
-                        logger.warning(f"Failed to extract field '{field_name}' with selector '{selector}': {e}")
-            
-            else:
-                # Intelligente automatische Extraktion
-                logger.info("Using intelligent automatic extraction")
-                
-                # JavaScript für intelligente Extraktion ausführen
-                extracted_data = await page.evaluate("""
-                    () => {
-                        const data = {};
-                        
-                        // Suche nach Problem-/Schadensbeschreibung
-                        const problemSelectors = [
-                            '[class*="problem"]', '[class*="beschreibung"]', '[class*="schaden"]',
-                            '[class*="meldung"]', '[class*="info"]', '[id*="problem"]', 
-                            '[id*="beschreibung"]', 'textarea', '.description'
-                        ];
-                        
-                        for (let selector of problemSelectors) {
-                            const element = document.querySelector(selector);
-                            if (element && element.innerText.trim().length > 10) {
-                                data.problem_description = element.innerText.trim();
-                                break;
-                            }
-                        }
-                        
-                        // Suche nach Auftragsnummer/Bestellnummer
-                        const orderSelectors = [
-                            '[class*="order"]', '[class*="auftrag"]', '[class*="bestell"]',
-                            '[class*="referenz"]', '[id*="order"]', '[id*="nummer"]'
-                        ];
-                        
-                        for (let selector of orderSelectors) {
-                            const element = document.querySelector(selector);
-                            if (element) {
-                                const text = element.innerText.trim();
-                                const numberMatch = text.match(/[A-Z]?\\d{6,}/);
-                                if (numberMatch) {
-                                    data.order_number = numberMatch[0];
-                                    break;
-                                }
-                            }
-                        }
-                        
-                        // Suche nach Termininformationen
-                        const dateSelectors = [
-                            '[class*="termin"]', '[class*="date"]', '[class*="datum"]',
-                            'input[type="date"]', '[id*="termin"]', '[id*="date"]'
-                        ];
-                        
-                        for (let selector of dateSelectors) {
-                            const element = document.querySelector(selector);
-                            if (element) {
-                                const text = element.innerText || element.value || '';
-                                const dateMatch = text.match(/\\d{1,2}\\.\\d{1,2}\\.\\d{4}|\\d{4}-\\d{2}-\\d{2}/);
-                                if (dateMatch) {
-                                    data.appointment_date = dateMatch[0];
-                                    break;
-                                }
-                            }
-                        }
-                        
-                        // Suche nach Zeitangaben
-                        const timeSelectors = [
-                            '[class*="zeit"]', '[class*="time"]', '[class*="uhr"]',
-                            'input[type="time"]', '[id*="zeit"]', '[id*="time"]'
-                        ];
-                        
-                        for (let selector of timeSelectors) {
-                            const element = document.querySelector(selector);
-                            if (element) {
-                                const text = element.innerText || element.value || '';
-                                const timeMatch = text.match(/\\d{1,2}:\\d{2}.*?\\d{1,2}:\\d{2}|\\d{1,2}:\\d{2}/);
-                                if (timeMatch) {
-                                    data.appointment_time = timeMatch[0];
-                                    break;
-                                }
-                            }
-                        }
-                        
-                        // Suche nach Standort/Objekt
-                        const locationSelectors = [
-                            '[class*="standort"]', '[class*="objekt"]', '[class*="location"]',
-                            '[class*="adresse"]', '[id*="standort"]', '[id*="objekt"]'
-                        ];
-                        
-                        for (let selector of locationSelectors) {
-                            const element = document.querySelector(selector);
-                            if (element && element.innerText.trim().length > 5) {
-                                data.location_name = element.innerText.trim();
-                                break;
-                            }
-                        }
-                        
-                        // Suche nach Kontaktperson
-                        const contactSelectors = [
-                            '[class*="kontakt"]', '[class*="ansprech"]', '[class*="meldender"]',
-                            '[class*="contact"]', '[id*="kontakt"]', '[id*="contact"]'
-                        ];
-                        
-                        for (let selector of contactSelectors) {
-                            const element = document.querySelector(selector);
-                            if (element && element.innerText.trim().length > 3) {
-                                data.contact_person = element.innerText.trim();
-                                break;
-                            }
-                        }
-                        
-                        // Suche nach Telefonnummer
-                        const phonePattern = /\\+?[\\d\\s\\-\\(\\)]{8,}/;
-                        const allText = document.body.innerText;
-                        const phoneMatch = allText.match(phonePattern);
-                        if (phoneMatch) {
-                            data.contact_phone = phoneMatch[0].trim();
-                        }
-                        
-                        // Sammle alle Tabellendaten (oft enthalten strukturierte Informationen)
-                        const tables = document.querySelectorAll('table');
-                        if (tables.length > 0) {
-                            data.table_data = [];
-                            tables.forEach((table, index) => {
-                                if (index < 3) { // Nur erste 3 Tabellen
-                                    const rows = [];
-                                    table.querySelectorAll('tr').forEach(row => {
-                                        const cells = [];
-                                        row.querySelectorAll('td, th').forEach(cell => {
-                                            cells.push(cell.innerText.trim());
-                                        });
-                                        if (cells.length > 0) rows.push(cells);
-                                    });
-                                    if (rows.length > 0) data.table_data.push(rows);
-                                }
-                            });
-                        }
-                        
-                        return data;
-                    }
-                """)
-                
-                result.update(extracted_data)
-            
-            # Zusätzliche Metadaten extrahieren
-            result["page_html"] = await page.content()  # Vollständiges HTML für weitere Verarbeitung
-            result["extraction_method"] = "custom" if custom_selectors else "intelligent"
-            
-            logger.info(f"Extracted work order data from {url}: {list(result.keys())}")
-            return result
+            async with self.new_page() as page:
+                await self._goto(page, url)
+                return await self._extract_work_order_from_page(page, url, custom_selectors, include_html)
             
         except Exception as e:
             logger.error(f"Failed to extract work order data from {url}: {e}")
             raise
-        finally:
-            await page.close()
+    
+    async def _extract_work_order_from_page(self, page: Page, url: str,
+                                            custom_selectors: Optional[Dict[str, str]] = None,
+                                            include_html: bool = False) -> Dict[str, Any]:
+        """Auftragsdaten aus einer bereits geladenen Seite extrahieren"""
+        if custom_selectors:
+            logger.info("Using custom selectors for work order extraction")
+            # Alle CSS-Selektoren in einem Roundtrip, nur Playwright-spezifische einzeln
+            extraction = page.evaluate(
+                "(selectors) => window.__czisch.selectorTexts(selectors)", custom_selectors
+            )
+        else:
+            # Intelligente automatische Extraktion
+            logger.info("Using intelligent automatic extraction")
+            extraction = page.evaluate(
+                "([selectors, tableLimits]) => window.__czisch.extractWorkOrder(selectors, tableLimits)",
+                [_WORK_ORDER_SELECTORS, _TABLE_LIMITS]
+            )
+        
+        # Titel, Extraktion und ggf. HTML sind unabhängig und laufen parallel über die CDP-Verbindung
+        calls = [page.title(), extraction]
+        if include_html:
+            calls.append(page.content())
+        title, extracted, *page_html = await asyncio.gather(*calls)
+        
+        # Basis-Informationen sammeln
+        result = {
+            "url": url,
+            "title": title,
+            "extraction_timestamp": datetime.now().isoformat()
+        }
+        
+        # Verwende custom selectors falls vorhanden
+        if custom_selectors:
+            texts = extracted["texts"]
+            unsupported = set(extracted["unsupported"])
+            for field_name, selector in custom_selectors.items():
+                try:
+                    if field_name in unsupported:
+                        element = await page.query_selector(selector)
+                        text = await element.inner_text() if element else None
+                    else:
+                        text = texts.get(field_name)
+                    if text is not None:
+                        result[field_name] = text
+                    else:
+                        logger.warning(f"Selector '{selector}' for field '{field_name}' found no elements")
+                except Exception as e:
+                    logger.warning(f"Failed to extract field '{field_name}' with selector '{selector}': {e}")
+        
+        else:
+            result.update(extracted["data"])
+            # Erster Kandidat je Gruppe, dessen Text das Muster enthält
+            for field, group, pattern in _WORK_ORDER_PATTERN_FIELDS:
+                for text in extracted["candidates"][group]:
+                    match = pattern.search(text)
+                    if match:
+                        result[field] = match.group(0)
+                        break
+        
+        # Zusätzliche Metadaten extrahieren
+        if page_html:
+            result["page_html"] = page_html[0]  # Vollständiges HTML für weitere Verarbeitung
+        result["extraction_method"] = "custom" if custom_selectors else "intelligent"
+        
+        logger.info(f"Extracted work order data from {url}: {list(result.keys())}")
+        return result
     
     async def extract_with_smart_detection(self, url: str) -> Dict[str, Any]:
         """
@@ -299,49 +583,24 @@ class PlaywrightService:
         if not self.browser:
             raise RuntimeError("Playwright browser not initialized")
         
-        page = await self.browser.new_page()
-        try:
-            await page.goto(url, timeout=settings.playwright_timeout)
+        # Analyse und Extraktion auf derselben Seite, die URL wird nur einmal geladen
+        async with self.new_page() as page:
+            if settings.playwright_block_stylesheets:
+                # Klassenbasierte Erkennung braucht CSS; Page-Routen haben Vorrang vor der Context-Route.
+                # Seite und Context werden nach dem Aufruf verworfen, die Ausnahme endet mit ihnen
+                await page.route("**/*", _block_heavy_resources)
+            await self._goto(page, url)
             
             # Website-Typ erkennen
-            site_analysis = await page.evaluate("""
-                () => {
-                    const analysis = {
-                        has_forms: document.querySelectorAll('form').length > 0,
-                        has_tables: document.querySelectorAll('table').length > 0,
-                        has_cms_indicators: false,
-                        likely_cms: 'unknown',
-                        form_count: document.querySelectorAll('form').length,
-                        table_count: document.querySelectorAll('table').length,
-                        input_count: document.querySelectorAll('input').length
-                    };
-                    
-                    // CMS-Erkennung
-                    const bodyClasses = document.body.className.toLowerCase();
-                    const headContent = document.head.innerHTML.toLowerCase();
-                    
-                    if (bodyClasses.includes('wordpress') || headContent.includes('wp-content')) {
-                        analysis.likely_cms = 'wordpress';
-                        analysis.has_cms_indicators = true;
-                    } else if (bodyClasses.includes('drupal') || headContent.includes('drupal')) {
-                        analysis.likely_cms = 'drupal';
-                        analysis.has_cms_indicators = true;
-                    } else if (headContent.includes('typo3')) {
-                        analysis.likely_cms = 'typo3';
-                        analysis.has_cms_indicators = true;
-                    }
-                    
-                    return analysis;
-                }
-            """)
+            site_analysis = await page.evaluate("() => window.__czisch.detectSite()")
             
             # Basierend auf Analyse entsprechende Extraktion durchführen
             if site_analysis['has_forms'] and site_analysis['input_count'] > 5:
                 # Wahrscheinlich ein Formular-System
-                return await self.extract_work_order_data(url)
+                return await self._extract_work_order_from_page(page, url, include_html=True)
             elif site_analysis['has_tables']:
                 # Tabellen-basierte Darstellung
-                return await self.extract_from_url(url, {
+                return await self._extract_from_page(page, url, {
                     "extract_links": True,
                     "selectors": {
                         "table_content": "table",
@@ -349,11 +608,8 @@ class PlaywrightService:
                     }
                 })
             else:
-                # Standard-Extraktion
-                return await self.extract_work_order_data(url)
-                
-        finally:
-            await page.close()
+                # Standard-Extraktion (wie bisher mit page_html)
+                return await self._extract_work_order_from_page(page, url, include_html=True)
     
     def is_available(self) -> bool:
         """Check if Playwright browser is available"""
@@ -1,14 +1,96 @@
-from typing import Any, Dict, Optional
-import json
-import aiofiles
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import csv
+import orjson
 import httpx
 import logging
+import time
+import uuid
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 from datetime import datetime
 from pathlib import Path
 from app.services.ssh_transfer_service import SSHTransferService
 
 logger = logging.getLogger(__name__)
 
+# orjson options for JSON files: 2-space indent like before, int/other dict keys as strings like json
+_JSON_FILE_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+# orjson options for webhook/API request bodies: int/other dict keys as strings like json
+_JSON_BODY_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+# Shared HTTP client for webhook/API transfers, so repeated sends to the same host reuse
+# pooled keep-alive connections instead of a new TCP/TLS handshake per transfer
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+class _BatchSender:
+    """Coalesces webhook/API payloads for the same request target into one {"batch": [...]} request
+    
+    The first payload for a target starts a short timer; the batch is sent when the timer fires
+    or max_size payloads are waiting. Every sender gets the response of the shared request.
+    """
+    
+    def __init__(self, max_size: int = 100, max_delay: float = 0.05):
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._pending: Dict[Tuple, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple, asyncio.Task] = {}
+    
+    async def send(self, method: str, url: str, payload: Any, headers: Dict[str, str],
+                   auth: Optional[Tuple[str, str]], timeout: float) -> httpx.Response:
+        key = (method, url, tuple(sorted(headers.items())), auth, timeout)
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((payload, future))
+        
+        if len(batch) >= self.max_size:
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            await self._post(key, self._pending.pop(key))
+        elif len(batch) == 1:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+        
+        return await future
+    
+    async def _flush_later(self, key: Tuple):
+        await asyncio.sleep(self.max_delay)
+        self._timers.pop(key, None)
+        await self._post(key, self._pending.pop(key, []))
+    
+    async def _post(self, key: Tuple, batch: List[Tuple[Any, asyncio.Future]]):
+        method, url, headers, auth, timeout = key
+        try:
+            body, request_headers = TransferService._json_body(
+                {"batch": [payload for payload, _ in batch]}, dict(headers)
+            )
+            response = await TransferService._get_http_client().request(
+                method,
+                url,
+                content=body,
+                headers=request_headers,
+                auth=auth,
+                timeout=timeout
+            )
+            response.raise_for_status()
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(response)
+
+
+# Opt-in batching for webhook/API transfers (transfer_config "batch": true)
+_batch_sender = _BatchSender()
+
 
 class TransferService:
     """Service for data transfer operations"""
@@ -21,26 +103,15 @@ class TransferService:
     ) -> Dict[str, Any]:
         """Transfer data to various destinations"""
         
-        transfer_id = f"transfer_{hash(str(data))}_{int(datetime.now().timestamp())}"
+        # Random ID instead of hash(str(data)), which rendered the whole payload just to name the transfer
+        transfer_id = f"transfer_{uuid.uuid4().hex}_{int(time.time())}"
         destination = destination.lower()
         
         try:
-            if destination == "ssh":
-                result = await TransferService._transfer_via_ssh(data, config, transfer_id)
-            elif destination == "webhook":
-                result = await TransferService._transfer_to_webhook(data, config, transfer_id)
-            elif destination == "database":
-                result = await TransferService._transfer_to_database(data, config, transfer_id)
-            elif destination == "file":
-                result = await TransferService._transfer_to_file(data, config, transfer_id)
-            elif destination == "api":
-                result = await TransferService._transfer_to_api(data, config, transfer_id)
-            elif destination == "email":
-                result = await TransferService._transfer_to_email(data, config, transfer_id)
-            elif destination == "storage":
-                result = await TransferService._transfer_to_storage(data, config, transfer_id)
-            else:
+            handler = _DESTINATION_HANDLERS.get(destination)
+            if handler is None:
                 raise ValueError(f"Unsupported destination: {destination}")
+            result = await handler(data, config, transfer_id)
             
             logger.info(f"Data transfer to {destination} completed successfully")
             
@@ -55,6 +126,34 @@ class TransferService:
             logger.error(f"Transfer error: {e}")
             raise
     
+    @staticmethod
+    def _get_http_client() -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use"""
+        global _http_client
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(30.0)
+            )
+        return _http_client
+    
+    @staticmethod
+    async def close_http_client():
+        """Close the shared HTTP client (application shutdown)"""
+        global _http_client
+        if _http_client is not None:
+            await _http_client.aclose()
+            _http_client = None
+    
+    @staticmethod
+    def _json_body(payload: Any, headers: Dict[str, str]) -> Tuple[bytes, Dict[str, str]]:
+        """Serialize a request body with orjson and make sure a JSON Content-Type is sent"""
+        body = orjson.dumps(payload, option=_JSON_BODY_OPTIONS)
+        if not any(name.lower() == "content-type" for name in headers):
+            headers = {**headers, "Content-Type": "application/json"}
+        return body, headers
+    
     @staticmethod
     async def _transfer_via_ssh(data: Any, config: Dict[str, Any], transfer_id: str) -> Dict[str, Any]:
         """Transfer data via SSH using route configuration"""
@@ -100,31 +199,36 @@ class TransferService:
         if config.get("custom_fields"):
             payload.update(config["custom_fields"])
         
-        async with httpx.AsyncClient() as client:
-            if method == "POST":
-                response = await client.post(
-                    webhook_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=timeout
-                )
-            elif method == "PUT":
-                response = await client.put(
-                    webhook_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=timeout
-                )
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            response.raise_for_status()
-            
-            return {
-                "webhook_url": webhook_url,
-                "status_code": response.status_code,
-                "response_body": response.text[:500]  # Limit response body
-            }
+        client = TransferService._get_http_client()
+        if config.get("batch") and method in ("POST", "PUT"):
+            # Sent together with other payloads for this webhook as {"batch": [...]}
+            response = await _batch_sender.send(method, webhook_url, payload, headers, None, timeout)
+        elif method == "POST":
+            body, request_headers = TransferService._json_body(payload, headers)
+            response = await client.post(
+                webhook_url,
+                content=body,
+                headers=request_headers,
+                timeout=timeout
+            )
+        elif method == "PUT":
+            body, request_headers = TransferService._json_body(payload, headers)
+            response = await client.put(
+                webhook_url,
+                content=body,
+                headers=request_headers,
+                timeout=timeout
+            )
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        
+        response.raise_for_status()
+        
+        return {
+            "webhook_url": webhook_url,
+            "status_code": response.status_code,
+            "response_body": response.text[:500]  # Limit response body
+        }
     
     @staticmethod
     async def _transfer_to_database(data: Any, config: Dict[str, Any], transfer_id: str) -> Dict[str, Any]:
@@ -152,6 +256,8 @@ class TransferService:
     @staticmethod
     async def _transfer_to_file(data: Any, config: Dict[str, Any], transfer_id: str) -> Dict[str, Any]:
         """Transfer data to file system"""
+        if config and config.get("files"):
+            return await TransferService._transfer_batch_to_file(data, config, transfer_id)
         if not config or "file_path" not in config:
             raise ValueError("file_path required in transfer_config for file destination")
         
@@ -159,51 +265,153 @@ class TransferService:
         file_format = config.get("format", "json").lower()
         append_mode = config.get("append", False)
         
-        # Ensure directory exists
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+        content = TransferService._format_file_content(data, file_format, transfer_id)
+        
+        # Create the directory, open, write and size the file in one worker thread
+        mode = "a" if append_mode else "w"
+        if file_format == "csv":
+            job = (file_path, mode, b"", data, False)
+        else:
+            job = (file_path, mode, content, None, append_mode)
+        file_size = (await asyncio.to_thread(TransferService._write_batch_sync, [job]))[0]
+        
+        return {
+            "file_path": str(file_path),
+            "file_format": file_format,
+            "file_size": file_size,
+            "append_mode": append_mode
+        }
+    
+    @staticmethod
+    async def _transfer_batch_to_file(data: Any, config: Dict[str, Any], transfer_id: str) -> Dict[str, Any]:
+        """Write one data item per entry of config["files"], all in a single worker thread
+        
+        Each entry needs a file_path; format and append default to the top-level config.
+        """
+        files = config["files"]
+        if not isinstance(data, list) or len(data) != len(files):
+            raise ValueError("data must be a list with one item per entry in files")
+        
+        jobs = []
+        results = []
+        timestamp = None
+        for item, file_config in zip(data, files):
+            if "file_path" not in file_config:
+                raise ValueError("file_path required for every entry in files")
+            file_path = Path(file_config["file_path"])
+            file_format = file_config.get("format", config.get("format", "json")).lower()
+            append_mode = file_config.get("append", config.get("append", False))
+            
+            if timestamp is None and file_format != "csv":
+                # One timestamp for the whole batch, formatted only if a file needs it
+                timestamp = datetime.now().isoformat()
+            content = TransferService._format_file_content(item, file_format, transfer_id, timestamp)
+            mode = "a" if append_mode else "w"
+            if file_format == "csv":
+                jobs.append((file_path, mode, b"", item, False))
+            else:
+                jobs.append((file_path, mode, content, None, append_mode))
+            results.append({
+                "file_path": str(file_path),
+                "file_format": file_format,
+                "append_mode": append_mode
+            })
+        
+        sizes = await asyncio.to_thread(TransferService._write_batch_sync, jobs)
+        for result, file_size in zip(results, sizes):
+            result["file_size"] = file_size
         
-        # Prepare content based on format
+        return {
+            "files": results,
+            "file_count": len(results)
+        }
+    
+    @staticmethod
+    def _format_file_content(
+        data: Any,
+        file_format: str,
+        transfer_id: str,
+        timestamp: Optional[str] = None
+    ) -> Optional[bytes]:
+        """Render data as UTF-8 bytes for the file format (CSV data is only validated)"""
         if file_format == "json":
-            content = json.dumps({
+            return orjson.dumps({
                 "transfer_id": transfer_id,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp or datetime.now().isoformat(),
                 "data": data
-            }, indent=2, default=str)
+            }, option=_JSON_FILE_OPTIONS, default=str)
         elif file_format == "txt":
-            content = f"Transfer ID: {transfer_id}\n"
-            content += f"Timestamp: {datetime.now().isoformat()}\n"
-            content += f"Data: {str(data)}\n"
+            return (
+                f"Transfer ID: {transfer_id}\n"
+                f"Timestamp: {timestamp or datetime.now().isoformat()}\n"
+                f"Data: {str(data)}\n"
+            ).encode("utf-8")
         elif file_format == "csv":
             # For CSV, data should be a list of dictionaries
-            if isinstance(data, list) and all(isinstance(item, dict) for item in data):
-                import csv
-                import io
-                
-                output = io.StringIO()
-                if data:
-                    writer = csv.DictWriter(output, fieldnames=data[0].keys())
-                    writer.writeheader()
-                    writer.writerows(data)
-                content = output.getvalue()
-            else:
+            if not (isinstance(data, list) and all(isinstance(item, dict) for item in data)):
                 raise ValueError("CSV format requires data to be a list of dictionaries")
+            return None
         else:
             raise ValueError(f"Unsupported file format: {file_format}")
-        
-        # Write to file
-        mode = "a" if append_mode else "w"
-        async with aiofiles.open(file_path, mode=mode, encoding="utf-8") as f:
-            if append_mode and file_format in ["json", "txt"]:
-                await f.write("\n" + content)
-            else:
-                await f.write(content)
-        
-        return {
-            "file_path": str(file_path),
-            "file_format": file_format,
-            "file_size": file_path.stat().st_size,
-            "append_mode": append_mode
-        }
+    
+    @staticmethod
+    def _write_batch_sync(jobs: List[Tuple[Path, str, bytes, Optional[List[Dict[str, Any]]], bool]]) -> List[int]:
+        """Create the parent directories and write every file (runs in one worker thread)"""
+        # Each parent directory only once, before any file is opened
+        for parent in {file_path.parent for file_path, *_ in jobs}:
+            parent.mkdir(parents=True, exist_ok=True)
+        
+        sizes = []
+        for file_path, mode, content, rows, separator in jobs:
+            sizes.append(TransferService._write_sync(file_path, mode, content, rows=rows, separator=separator))
+        return sizes
+    
+    @staticmethod
+    def _write_sync(
+        file_path: Path,
+        mode: str,
+        content: bytes = b"",
+        rows: Optional[List[Dict[str, Any]]] = None,
+        separator: bool = False
+    ) -> int:
+        """Write content (or CSV rows) to the file and return its size (runs in a worker thread)"""
+        if rows is not None:
+            # newline="" lets the csv module control line endings, like the csv docs require
+            with open(file_path, mode, encoding="utf-8", newline="") as f:
+                TransferService._write_csv_rows(f, rows)
+                return f.tell()
+        
+        # Content is already UTF-8 encoded, so skip the text layer
+        with open(file_path, mode + "b") as f:
+            # Separator written on its own instead of copying the whole content
+            if separator:
+                f.write(b"\n")
+            f.write(content)
+            # End position of the open file is its size (also in append mode), no extra stat call
+            return f.tell()
+    
+    @staticmethod
+    def _write_csv_rows(f, rows: List[Dict[str, Any]]):
+        """Write header and rows straight to the open file"""
+        if not rows:
+            return
+        
+        # Header from the first row; plain csv.writer skips DictWriter's per-row key checks
+        fieldnames = tuple(rows[0])
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(TransferService._csv_row_values(row, fieldnames) for row in rows)
+    
+    @staticmethod
+    def _csv_row_values(row: Dict[str, Any], fieldnames: Tuple[str, ...]):
+        """Row values in header order (missing fields empty, unknown fields rejected like DictWriter)"""
+        if tuple(row) == fieldnames:
+            return row.values()
+        
+        extra_fields = row.keys() - set(fieldnames)
+        if extra_fields:
+            raise ValueError(f"dict contains fields not in fieldnames: {', '.join(map(repr, extra_fields))}")
+        return [row.get(name, "") for name in fieldnames]
     
     @staticmethod
     async def _transfer_to_api(data: Any, config: Dict[str, Any], transfer_id: str) -> Dict[str, Any]:
@@ -226,50 +434,57 @@ class TransferService:
                 "data": data
             }
         
-        async with httpx.AsyncClient() as client:
-            # Prepare auth if provided
-            auth_obj = None
-            if auth:
-                if auth.get("type") == "basic":
-                    auth_obj = (auth["username"], auth["password"])
-                elif auth.get("type") == "bearer":
-                    headers["Authorization"] = f"Bearer {auth['token']}"
-            
-            if method == "POST":
-                response = await client.post(
-                    api_endpoint,
-                    json=payload,
-                    headers=headers,
-                    auth=auth_obj,
-                    timeout=timeout
-                )
-            elif method == "PUT":
-                response = await client.put(
-                    api_endpoint,
-                    json=payload,
-                    headers=headers,
-                    auth=auth_obj,
-                    timeout=timeout
-                )
-            elif method == "PATCH":
-                response = await client.patch(
-                    api_endpoint,
-                    json=payload,
-                    headers=headers,
-                    auth=auth_obj,
-                    timeout=timeout
-                )
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            response.raise_for_status()
-            
-            return {
-                "api_endpoint": api_endpoint,
-                "method": method,
-                "status_code": response.status_code,
-                "response_body": response.text[:500]
-            }
+        client = TransferService._get_http_client()
+        
+        # Prepare auth if provided
+        auth_obj = None
+        if auth:
+            if auth.get("type") == "basic":
+                auth_obj = (auth["username"], auth["password"])
+            elif auth.get("type") == "bearer":
+                headers["Authorization"] = f"Bearer {auth['token']}"
+        
+        if config.get("batch") and method in ("POST", "PUT", "PATCH"):
+            # Sent together with other payloads for this endpoint as {"batch": [...]}
+            response = await _batch_sender.send(method, api_endpoint, payload, headers, auth_obj, timeout)
+        elif method == "POST":
+            body, request_headers = TransferService._json_body(payload, headers)
+            response = await client.post(
+                api_endpoint,
+                content=body,
+                headers=request_headers,
+                auth=auth_obj,
+                timeout=timeout
+            )
+        elif method == "PUT":
+            body, request_headers = TransferService._json_body(payload, headers)
+            response = await client.put(
+                api_endpoint,
+                content=body,
+                headers=request_headers,
+                auth=auth_obj,
+                timeout=timeout
+            )
+        elif method == "PATCH":
+            body, request_headers = TransferService._json_body(payload, headers)
+            response = await client.patch(
+                api_endpoint,
+                content=body,
+                headers=request_headers,
+                auth=auth_obj,
+                timeout=timeout
+            )
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        
+        response.raise_for_status()
+        
+        return {
+            "api_endpoint": api_endpoint,
+            "method": method,
+            "status_code": response.status_code,
+            "response_body": response.text[:500]
+        }
     
     @staticmethod
     async def _transfer_to_email(data: Any, config: Dict[str, Any], transfer_id: str) -> Dict[str, Any]:
@@ -320,3 +535,15 @@ class TransferService:
             "data_size": len(str(data)),
             "status": "uploaded"
         }
+
+
+# Destination name -> transfer handler, looked up once per transfer_data call
+_DESTINATION_HANDLERS = {
+    "ssh": TransferService._transfer_via_ssh,
+    "webhook": TransferService._transfer_to_webhook,
+    "database": TransferService._transfer_to_database,
+    "file": TransferService._transfer_to_file,
+    "api": TransferService._transfer_to_api,
+    "email": TransferService._transfer_to_email,
+    "storage": TransferService._transfer_to_storage,
+}
@@ -1,13 +1,196 @@
-from typing import Any, Dict, Optional
-import json
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Union
+import hashlib
+import orjson
 import re
+import threading
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache, partial, singledispatch
+from itertools import islice
 import logging
-from app.database.models import etl_db
+from cachetools import LRUCache, TTLCache
+try:
+    # google-re2: automaton-based matching, no backtracking on rule patterns it supports
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+from app.database.models import etl_db, TransformRule
 from app.services.html_transform_service import HTMLToXMLTransformService
 
 logger = logging.getLogger(__name__)
 
+# Transform rule lookups (including misses) keyed by rule name; cleared when rules change
+_rule_cache: TTLCache = TTLCache(maxsize=256, ttl=60)
+_rule_cache_lock = threading.Lock()
+_CACHE_MISS = object()
+
+# HTML-to-XML results keyed by (rule name, digest of the HTML); value is (rule object, xml).
+# A hit only counts for the same rule object, so a re-fetched or changed rule recomputes.
+_result_cache: LRUCache = LRUCache(maxsize=256)
+
+# orjson options of the to_json rule (dicts may have int keys)
+_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+# Rules of _apply_numeric_transformations; lists of numbers get them applied element-wise
+_NUMERIC_RULES = ("multiply", "add", "subtract", "divide", "round", "absolute")
+
+# Rules of _apply_string_transformations; lists of strings get them applied element-wise
+_STRING_RULES = (
+    "uppercase", "lowercase", "title_case", "capitalize", "strip",
+    "replace", "regex_replace", "prefix", "suffix"
+)
+
+
+# Characters with a meaning in a regex; patterns without any are plain text
+_REGEX_METACHARS_RE = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+class _LiteralPattern:
+    """Stand-in for a compiled pattern without metacharacters, substituting with str.replace"""
+    __slots__ = ("pattern",)
+    
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+    
+    def sub(self, repl: str, string: str) -> str:
+        if "\\" in repl:
+            # Backslash escapes/group references in the replacement need re's template handling
+            return re.sub(re.escape(self.pattern), repl, string)
+        return string.replace(self.pattern, repl)
+
+
+# Larger than re's internal cache (512) so jobs with many distinct rule patterns do not thrash it
+@lru_cache(maxsize=1024)
+def _compile(pattern: str, strict_linear: bool = False):
+    """Compiled regex for a rule pattern, reused across calls applying the same rule
+
+    Patterns use the stdlib engine, which raises re.error for invalid patterns. Only with
+    strict_linear they must compile with RE2 (linear-time matching), else re.error; RE2 is
+    opt-in because its syntax differs (e.g. ASCII-only \\w and \\b, no lookaround).
+    Plain-text patterns skip the regex engines and substitute with str.replace.
+    """
+    if not _REGEX_METACHARS_RE.search(pattern):
+        return _LiteralPattern(pattern)
+    if not strict_linear:
+        return re.compile(pattern)
+    if not RE2_AVAILABLE:
+        raise re.error("strict_linear requires google-re2 to be installed", pattern)
+    try:
+        return re2.compile(pattern)
+    except re2.error as e:
+        raise re.error(f"Pattern not supported by RE2: {e}", pattern) from e
+
+
+@dataclass(frozen=True, slots=True)
+class TransformRules:
+    """Legacy transformation rules, read once from the request dict into slotted fields
+
+    Numeric rules hold None while inactive, so the apply functions need one attribute check
+    per rule instead of a dict lookup for the flag and another for its value.
+    """
+    # String rules
+    uppercase: bool = False
+    lowercase: bool = False
+    title_case: bool = False
+    capitalize: bool = False
+    strip: bool = False
+    replace: Optional[Tuple[str, str]] = None
+    regex_replace: Optional[Tuple[str, str]] = None
+    regex_strict_linear: bool = False
+    prefix: str = ""
+    suffix: str = ""
+    # Numeric rules
+    multiply_by: Optional[float] = None
+    add_value: Optional[float] = None
+    subtract_value: Optional[float] = None
+    divide_by: Optional[float] = None
+    decimal_places: Optional[int] = None
+    absolute: bool = False
+    # Dict rules
+    allowed_keys: FrozenSet[Any] = frozenset()
+    excluded_keys: FrozenSet[Any] = frozenset()
+    key_mapping: Dict[Any, Any] = field(default_factory=dict)
+    add_timestamp: bool = False
+    flatten: bool = False
+    # List rules
+    sort: bool = False
+    sort_reverse: bool = False
+    limit_size: Optional[int] = None
+    unique: bool = False
+    allowed_values: Optional[list] = None
+    # General rules
+    to_json: bool = False
+    from_json: bool = False
+    # Whether any numeric/string rule is set, for element-wise list transformations
+    has_numeric_rules: bool = False
+    has_string_rules: bool = False
+    
+    @classmethod
+    def from_dict(cls, rules: Dict[str, Any]) -> "TransformRules":
+        """Read the rules dict of a transform request"""
+        get = rules.get
+        replace = get("replace")
+        regex_replace = get("regex_replace")
+        divisor = get("divide_by", 1)
+        return cls(
+            uppercase=bool(get("uppercase")),
+            lowercase=bool(get("lowercase")),
+            title_case=bool(get("title_case")),
+            capitalize=bool(get("capitalize")),
+            strip=bool(get("strip")),
+            replace=(replace.get("old", ""), replace.get("new", "")) if replace and isinstance(replace, dict) else None,
+            regex_replace=(
+                (regex_replace.get("pattern", ""), regex_replace.get("replacement", ""))
+                if regex_replace and isinstance(regex_replace, dict) else None
+            ),
+            regex_strict_linear=bool(
+                regex_replace and isinstance(regex_replace, dict) and regex_replace.get("strict_linear")
+            ),
+            prefix=get("prefix") or "",
+            suffix=get("suffix") or "",
+            multiply_by=get("multiply_by", 1) if get("multiply") else None,
+            add_value=get("add_value", 0) if get("add") else None,
+            subtract_value=get("subtract_value", 0) if get("subtract") else None,
+            # Division by zero leaves the value unchanged, same as no division
+            divide_by=divisor if get("divide") and divisor != 0 else None,
+            decimal_places=get("decimal_places", 0) if get("round") else None,
+            absolute=bool(get("absolute")),
+            allowed_keys=frozenset(get("allowed_keys") or ()) if get("filter_keys") else frozenset(),
+            excluded_keys=frozenset(get("excluded_keys") or ()) if get("exclude_keys") else frozenset(),
+            key_mapping=(get("key_mapping") or {}) if get("rename_keys") else {},
+            add_timestamp=bool(get("add_timestamp")),
+            flatten=bool(get("flatten")),
+            sort=bool(get("sort")),
+            sort_reverse=bool(get("sort_reverse", False)),
+            limit_size=get("limit_size") if get("limit") else None,
+            unique=bool(get("unique")),
+            allowed_values=(get("allowed_values") or None) if get("filter_values") else None,
+            to_json=bool(get("to_json")),
+            from_json=bool(get("from_json")),
+            has_numeric_rules=any(get(rule) for rule in _NUMERIC_RULES),
+            has_string_rules=any(get(rule) for rule in _STRING_RULES),
+        )
+    
+    @classmethod
+    def of(cls, rules: Union[Dict[str, Any], "TransformRules"]) -> "TransformRules":
+        """Rules as TransformRules, converting a plain rules dict"""
+        return rules if isinstance(rules, cls) else cls.from_dict(rules)
+
+
+def _has_auto_metadata(rules: List[Dict[str, Any]]) -> bool:
+    """Whether a rule set writes "auto" metadata (e.g. the timestamp), which differs per call"""
+    return any(
+        "auto" in rule.get("add_metadata", {}).values()
+        for rule in rules
+        if isinstance(rule, dict) and isinstance(rule.get("add_metadata"), dict)
+    )
+
+
+def _unchanged(data: Any) -> Any:
+    """Transformation for empty rules"""
+    return data
+
 
 class TransformService:
     """Service for data transformation operations"""
@@ -15,42 +198,64 @@ class TransformService:
     @staticmethod
     def transform_data(data: Any, rules: Optional[Dict[str, Any]] = None) -> Any:
         """Transform data based on provided rules or database rule sets"""
+        return TransformService.compile(rules)(data)
+    
+    @staticmethod
+    def compile(rules: Optional[Dict[str, Any]] = None) -> Callable[[Any], Any]:
+        """Read the rules once and return a function transforming one record with them
         
+        For many records under the same rules: `fn = TransformService.compile(rules)`,
+        then `[fn(record) for record in records]`.
+        """
         # Check for HTML-to-XML transformation with rule_name
         if rules and rules.get("rule_name"):
-            rule_name = rules["rule_name"]
-            return TransformService._transform_with_database_rule(data, rule_name)
+            return partial(TransformService._transform_with_database_rule, rule_name=rules["rule_name"])
         
         # Fallback to legacy transformation rules
         if not rules:
-            return data
+            return _unchanged
+        
+        try:
+            # Read the rules dict once; every record and list item reuses the parsed rules
+            parsed_rules = TransformService.validate_rules(TransformRules.from_dict(rules))
+        except Exception as e:
+            logger.error(f"Transform error: {e}")
+            raise
+        return partial(TransformService._apply_rules, rules=parsed_rules)
+    
+    @staticmethod
+    def validate_rules(rules: Union[Dict[str, Any], TransformRules]) -> TransformRules:
+        """Compile the regex of the rules up front and return the parsed rules
         
+        Raises re.error for an invalid pattern once, when the rules are compiled, instead of
+        on the first record; the compiled pattern is cached for the apply path.
+        """
+        if not isinstance(rules, TransformRules):
+            rules = TransformRules.from_dict(rules)
+        if rules.regex_replace is not None:
+            _compile(rules.regex_replace[0], rules.regex_strict_linear)
+        return rules
+    
+    @staticmethod
+    def transform_to_json_bytes(data: Any, rules: Optional[Dict[str, Any]] = None) -> bytes:
+        """Transform data and serialize the result as UTF-8 JSON in one step
+        
+        For callers that send the result on as JSON (e.g. flattened records): a `to_json`
+        rule is serialized here directly instead of building a str that is encoded again.
+        """
+        if rules and rules.get("to_json") and not rules.get("from_json") and not rules.get("rule_name"):
+            rules = {**rules, "to_json": False}
+        transformed_data = TransformService.transform_data(data, rules)
+        return orjson.dumps(transformed_data, option=_JSON_OPTIONS, default=str)
+    
+    @staticmethod
+    def _apply_rules(data: Any, rules: TransformRules) -> Any:
+        """Apply parsed legacy rules to one record"""
         transformed_data = data
         
         try:
-            # String transformations
-            if isinstance(transformed_data, str):
-                transformed_data = TransformService._apply_string_transformations(
-                    transformed_data, rules
-                )
-            
-            # Numeric transformations
-            elif isinstance(transformed_data, (int, float)):
-                transformed_data = TransformService._apply_numeric_transformations(
-                    transformed_data, rules
-                )
-            
-            # Dictionary transformations
-            elif isinstance(transformed_data, dict):
-                transformed_data = TransformService._apply_dict_transformations(
-                    transformed_data, rules
-                )
-            
-            # List transformations
-            elif isinstance(transformed_data, list):
-                transformed_data = TransformService._apply_list_transformations(
-                    transformed_data, rules
-                )
+            # Type-specific transformations
+            transformed_data = _apply_type_rules(transformed_data, rules)
             
             # Apply general transformations
             transformed_data = TransformService._apply_general_transformations(
@@ -68,8 +273,7 @@ class TransformService:
     def _transform_with_database_rule(data: Any, rule_name: str) -> str:
         """Transform data using database-stored transformation rules"""
         try:
-            # Get transformation rule from database
-            transform_rule = etl_db.get_transform_rule(rule_name)
+            transform_rule = TransformService._get_transform_rule(rule_name)
             
             if not transform_rule:
                 raise ValueError(f"Transform rule '{rule_name}' not found in database")
@@ -87,10 +291,24 @@ class TransformService:
                 # Convert other data types to string and treat as HTML
                 html_content = str(data)
             
+            # Same rule applied to the same HTML (retries, reprocessing) reuses the previous result,
+            # unless the rule writes "auto" metadata such as the current timestamp
+            cacheable = not _has_auto_metadata(transform_rule.rules)
+            if cacheable:
+                result_key = (rule_name, hashlib.blake2b(html_content.encode("utf-8"), digest_size=16).digest())
+                with _rule_cache_lock:
+                    cached = _result_cache.get(result_key)
+                if cached is not None and cached[0] is transform_rule:
+                    logger.info(f"Reusing cached transformation for rule '{rule_name}'")
+                    return cached[1]
+            
             # Apply HTML-to-XML transformation
             xml_result = HTMLToXMLTransformService.transform_html_to_xml(
                 html_content, transform_rule.rules
             )
+            if cacheable:
+                with _rule_cache_lock:
+                    _result_cache[result_key] = (transform_rule, xml_result)
             
             logger.info(f"Successfully transformed data using rule '{rule_name}'")
             return xml_result
@@ -100,165 +318,227 @@ class TransformService:
             raise
     
     @staticmethod
-    def _apply_string_transformations(data: str, rules: Dict[str, Any]) -> str:
+    def _get_transform_rule(rule_name: str) -> Optional[TransformRule]:
+        """Get transformation rule from cache, querying the database once per rule name on a miss"""
+        with _rule_cache_lock:
+            transform_rule = _rule_cache.get(rule_name, _CACHE_MISS)
+        if transform_rule is not _CACHE_MISS:
+            return transform_rule
+        
+        transform_rule = etl_db.get_transform_rule(rule_name)
+        if transform_rule is not None:
+            # Compile the rule's CSS selectors once at load time instead of on the first document
+            HTMLToXMLTransformService.precompile_selectors(transform_rule.rules)
+        with _rule_cache_lock:
+            _rule_cache[rule_name] = transform_rule
+        return transform_rule
+    
+    @staticmethod
+    def invalidate_rules():
+        """Drop cached transform rules and their results after rules were added or deleted"""
+        with _rule_cache_lock:
+            _rule_cache.clear()
+            _result_cache.clear()
+    
+    @staticmethod
+    def _apply_string_transformations(data: str, rules: Union[Dict[str, Any], TransformRules]) -> str:
         """Apply string-specific transformations"""
+        rules = TransformRules.of(rules)
         result = data
         
         # Case transformations
-        if rules.get("uppercase"):
+        if rules.uppercase:
             result = result.upper()
-        elif rules.get("lowercase"):
+        elif rules.lowercase:
             result = result.lower()
-        elif rules.get("title_case"):
+        elif rules.title_case:
             result = result.title()
-        elif rules.get("capitalize"):
+        elif rules.capitalize:
             result = result.capitalize()
         
         # String operations
-        if rules.get("strip"):
+        if rules.strip:
             result = result.strip()
         
-        if rules.get("replace"):
-            replace_config = rules["replace"]
-            if isinstance(replace_config, dict):
-                old = replace_config.get("old", "")
-                new = replace_config.get("new", "")
-                result = result.replace(old, new)
+        if rules.replace is not None:
+            old, new = rules.replace
+            result = result.replace(old, new)
         
         # Regex operations
-        if rules.get("regex_replace"):
-            regex_config = rules["regex_replace"]
-            if isinstance(regex_config, dict):
-                pattern = regex_config.get("pattern", "")
-                replacement = regex_config.get("replacement", "")
-                result = re.sub(pattern, replacement, result)
-        
-        # Add prefix/suffix
-        if rules.get("prefix"):
-            result = rules["prefix"] + result
-        if rules.get("suffix"):
-            result = result + rules["suffix"]
+        if rules.regex_replace is not None:
+            pattern, replacement = rules.regex_replace
+            result = _compile(pattern, rules.regex_strict_linear).sub(replacement, result)
+        
+        # Add prefix/suffix in one string build instead of one copy per side
+        if rules.prefix or rules.suffix:
+            result = f"{rules.prefix}{result}{rules.suffix}"
         
         return result
     
     @staticmethod
-    def _apply_numeric_transformations(data: float, rules: Dict[str, Any]) -> float:
+    def _apply_numeric_transformations(data: float, rules: Union[Dict[str, Any], TransformRules]) -> float:
         """Apply numeric transformations"""
+        rules = TransformRules.of(rules)
         result = data
         
         # Arithmetic operations
-        if rules.get("multiply"):
-            multiplier = rules.get("multiply_by", 1)
-            result = result * multiplier
+        if rules.multiply_by is not None:
+            result = result * rules.multiply_by
         
-        if rules.get("add"):
-            addend = rules.get("add_value", 0)
-            result = result + addend
+        if rules.add_value is not None:
+            result = result + rules.add_value
         
-        if rules.get("subtract"):
-            subtrahend = rules.get("subtract_value", 0)
-            result = result - subtrahend
+        if rules.subtract_value is not None:
+            result = result - rules.subtract_value
         
-        if rules.get("divide"):
-            divisor = rules.get("divide_by", 1)
-            if divisor != 0:
-                result = result / divisor
+        if rules.divide_by is not None:
+            result = result / rules.divide_by
         
         # Rounding
-        if rules.get("round"):
-            decimal_places = rules.get("decimal_places", 0)
-            result = round(result, decimal_places)
+        if rules.decimal_places is not None:
+            result = round(result, rules.decimal_places)
         
         # Absolute value
-        if rules.get("absolute"):
+        if rules.absolute:
             result = abs(result)
         
         return result
     
     @staticmethod
-    def _apply_dict_transformations(data: Dict[str, Any], rules: Dict[str, Any]) -> Dict[str, Any]:
+    def _apply_dict_transformations(
+        data: Dict[str, Any], rules: Union[Dict[str, Any], TransformRules]
+    ) -> Dict[str, Any]:
         """Apply dictionary-specific transformations"""
-        result = data.copy()
-        
-        # Filter keys
-        if rules.get("filter_keys"):
-            allowed_keys = rules.get("allowed_keys", [])
-            if allowed_keys:
-                result = {k: v for k, v in result.items() if k in allowed_keys}
-        
-        # Exclude keys
-        if rules.get("exclude_keys"):
-            excluded_keys = rules.get("excluded_keys", [])
-            if excluded_keys:
-                result = {k: v for k, v in result.items() if k not in excluded_keys}
-        
-        # Rename keys
-        if rules.get("rename_keys"):
-            rename_mapping = rules.get("key_mapping", {})
-            if rename_mapping:
-                for old_key, new_key in rename_mapping.items():
-                    if old_key in result:
-                        result[new_key] = result.pop(old_key)
+        rules = TransformRules.of(rules)
+        
+        # Filter and exclude keys in a single pass over the input
+        allowed = rules.allowed_keys
+        excluded = rules.excluded_keys
+        if allowed or excluded:
+            items = (
+                (k, v)
+                for k, v in data.items()
+                if (not allowed or k in allowed) and k not in excluded
+            )
+        else:
+            # No key filters: skip the per-key generator and copy the items in C
+            items = data.items()
+        
+        result = None
+        if rules.key_mapping:
+            # Rename in mapping order by pop-and-assign: the renamed value wins over an existing
+            # key of the new name, moves to the end and can be renamed again by a later mapping
+            result = dict(items)
+            for old_key, new_key in rules.key_mapping.items():
+                if old_key in result:
+                    result[new_key] = result.pop(old_key)
+            items = result.items()
+        
+        # Flatten nested dictionaries straight from the filtered items into one new dict;
+        # the input is never copied or mutated
+        if rules.flatten:
+            if rules.add_timestamp:
+                items = TransformService._with_timestamp(items, datetime.now().isoformat())
+            return TransformService._flatten_items(items, {})
+        
+        if result is None:
+            result = dict(items)
         
         # Add computed fields
-        if rules.get("add_timestamp"):
+        if rules.add_timestamp:
             result["timestamp"] = datetime.now().isoformat()
         
-        # Flatten nested dictionaries
-        if rules.get("flatten"):
-            result = TransformService._flatten_dict(result)
-        
         return result
     
     @staticmethod
-    def _apply_list_transformations(data: list, rules: Dict[str, Any]) -> list:
+    def _with_timestamp(items, timestamp: str):
+        """(key, value) pairs with "timestamp" set, as if assigned on the dict built from them"""
+        replaced = False
+        for k, v in items:
+            if k == "timestamp":
+                replaced = True
+                v = timestamp
+            yield k, v
+        if not replaced:
+            yield "timestamp", timestamp
+    
+    @staticmethod
+    def _apply_list_transformations(data: list, rules: Union[Dict[str, Any], TransformRules]) -> list:
         """Apply list-specific transformations"""
-        result = data.copy()
+        rules = TransformRules.of(rules)
+        # Sort, limit and unique are chained lazily; only the last step builds the result list
+        items = data
         
         # Sort list
-        if rules.get("sort"):
-            reverse = rules.get("sort_reverse", False)
+        if rules.sort:
             try:
-                result = sorted(result, reverse=reverse)
+                items = sorted(items, reverse=rules.sort_reverse)
             except TypeError:
                 logger.warning("Cannot sort list with mixed types")
         
-        # Limit list size
-        if rules.get("limit"):
-            limit_size = rules.get("limit_size", len(result))
-            result = result[:limit_size]
+        # Limit list size (before removing duplicates)
+        limit_size = rules.limit_size
+        if limit_size is not None:
+            items = islice(items, limit_size) if limit_size >= 0 else items[:limit_size]
         
         # Remove duplicates
-        if rules.get("unique"):
+        if rules.unique:
             # Preserve order while removing duplicates
-            seen = set()
-            result = [x for x in result if not (x in seen or seen.add(x))]
+            items = dict.fromkeys(items)
+        
+        result = list(items)
         
         # Filter list items
-        if rules.get("filter_values"):
-            allowed_values = rules.get("allowed_values", [])
-            if allowed_values:
+        allowed_values = rules.allowed_values
+        if allowed_values:
+            try:
+                allowed = set(allowed_values)
+                result = [item for item in result if item in allowed]
+            except TypeError:
+                # Unhashable values (e.g. dicts) can only be compared one by one
                 result = [item for item in result if item in allowed_values]
         
+        # Element-wise arithmetic on lists of numbers
+        # (bools are ints to isinstance, but are not numbers to transform)
+        if rules.has_numeric_rules and all(
+            isinstance(item, (int, float)) and type(item) is not bool for item in result
+        ):
+            result = TransformService._apply_numeric_array(result, rules)
+        
+        # Element-wise string operations on lists of strings
+        elif rules.has_string_rules and all(isinstance(item, str) for item in result):
+            result = TransformService._apply_string_array(result, rules)
+        
         return result
     
     @staticmethod
-    def _apply_general_transformations(data: Any, rules: Dict[str, Any]) -> Any:
+    def _apply_string_array(data: list, rules: TransformRules) -> list:
+        """Apply string transformations to every item, exactly as for a single string"""
+        return [TransformService._apply_string_transformations(item, rules) for item in data]
+    
+    @staticmethod
+    def _apply_numeric_array(data: list, rules: TransformRules) -> list:
+        """Apply numeric transformations to every item, exactly as for a single number"""
+        return [TransformService._apply_numeric_transformations(item, rules) for item in data]
+    
+    @staticmethod
+    def _apply_general_transformations(data: Any, rules: Union[Dict[str, Any], TransformRules]) -> Any:
         """Apply transformations that work on any data type"""
+        rules = TransformRules.of(rules)
         result = data
         
         # Convert to JSON string
-        if rules.get("to_json"):
+        if rules.to_json:
             try:
-                result = json.dumps(result, default=str)
+                result = orjson.dumps(result, option=_JSON_OPTIONS, default=str).decode()
             except TypeError as e:
                 logger.warning(f"Cannot convert to JSON: {e}")
         
         # Parse from JSON string
-        if rules.get("from_json") and isinstance(result, str):
+        if rules.from_json and isinstance(result, str):
             try:
-                result = json.loads(result)
-            except json.JSONDecodeError as e:
+                result = orjson.loads(result)
+            except orjson.JSONDecodeError as e:
                 logger.warning(f"Cannot parse JSON: {e}")
         
         return result
@@ -266,11 +546,38 @@ class TransformService:
     @staticmethod
     def _flatten_dict(d: dict, parent_key: str = '', sep: str = '.') -> dict:
         """Flatten a nested dictionary"""
-        items = []
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.extend(TransformService._flatten_dict(v, new_key, sep=sep).items())
+        return TransformService._flatten_items(iter(d.items()), {}, parent_key, sep)
+    
+    @staticmethod
+    def _flatten_items(items, out: dict, parent_key: str = '', sep: str = '.') -> dict:
+        """Flatten (key, value) pairs into out, nested dicts as 'parent.child' keys"""
+        # Explicit stack of item iterators instead of recursion; keeps the original key order
+        stack = [(parent_key, iter(items))]
+        while stack:
+            prefix, items = stack[-1]
+            for k, v in items:
+                new_key = f"{prefix}{sep}{k}" if prefix else k
+                if isinstance(v, dict):
+                    stack.append((new_key, iter(v.items())))
+                    break
+                out[new_key] = v
             else:
-                items.append((new_key, v))
-        return dict(items)
+                stack.pop()
+        return out
+
+
+@singledispatch
+def _apply_type_rules(data: Any, rules: TransformRules) -> Any:
+    """Type-specific transformation; types without one pass through unchanged
+    
+    singledispatch caches the implementation per concrete type, so subclasses
+    (e.g. OrderedDict, bool) resolve through the MRO once instead of per call.
+    """
+    return data
+
+
+_apply_type_rules.register(str, TransformService._apply_string_transformations)
+_apply_type_rules.register(int, TransformService._apply_numeric_transformations)
+_apply_type_rules.register(float, TransformService._apply_numeric_transformations)
+_apply_type_rules.register(dict, TransformService._apply_dict_transformations)
+_apply_type_rules.register(list, TransformService._apply_list_transformations)
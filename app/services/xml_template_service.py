@@ -1,12 +1,86 @@
-from typing import Dict, Any, Optional
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from typing import Dict, Any, Callable, List, Optional, Tuple
+try:
+    # lxml serializes in C and pretty-prints natively
+    from lxml import etree as ET
+    LXML_ETREE = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    LXML_ETREE = False
+import copy
+import io
 import logging
-from datetime import datetime
-import re
+import os
+import threading
+import time
+from functools import lru_cache, partial
+from app.services.xml_utils import xml_text
 
 logger = logging.getLogger(__name__)
 
+# Taifun-Namespace und Tags des Ah (Auftrag) Elements in Clark-Notation, mit und ohne Namespace
+_TAIFUN_NAMESPACE = 'urn:taifun-software.de:schema:TAIFUN'
+_TAIFUN_PREFIX = '{' + _TAIFUN_NAMESPACE + '}'
+_AH_TAGS = frozenset((_TAIFUN_PREFIX + 'Ah', 'Ah'))
+
+# Pflichtfelder im Ah-Element, in der Reihenfolge der Warnungen
+_AH_REQUIRED_FIELDS = ('Nr', 'Date', 'Info')
+
+# Zeichen pro feed() beim ereignisbasierten Validieren
+_VALIDATE_CHUNK_CHARS = 64 * 1024
+
+# Deklaration der Taifun-Exporte (doppelte Anführungszeichen wie im Original)
+_XML_DECLARATION = '<?xml version="1.0" encoding="windows-1252"?>'
+_XML_DECLARATION_LINE = (_XML_DECLARATION + '\n').encode('ascii')
+
+# Ein lxml-Parser pro Thread, statt für jedes Template einen neuen zu erzeugen
+_parser_local = threading.local()
+
+# Extrahierte Daten -> Ah-Felder: (Datenschlüssel nach Priorität, Tag, Umwandlung(Wert, Daten) oder None)
+_AH_FIELD_MAP: Tuple[Tuple[Tuple[str, ...], str, Optional[Callable[[Any, Dict[str, Any]], Any]]], ...] = (
+    # Problem-Beschreibung; Detaillierte Beschreibung mit Kurzbeschreibung als Fallback
+    (('problem_description',), 'Info', None),
+    (('detailed_description', 'problem_description'), 'VortextTxt', None),
+    # Bestellnummer
+    (('order_number',), 'BestellNr', lambda value, data: str(value)),
+    # Terminplanung
+    (('appointment_date',), 'DateTermin', None),
+    (('appointment_date',), 'Date2', None),
+    (('appointment_time_from',), 'TimeVon', None),
+    (('appointment_time_to',), 'TimeBis', None),
+    # Objekt/Standort-Informationen
+    (('location_name',), 'MtName1', None),
+    (('location_street',), 'MtAnschriftStr', None),
+    (('location_street',), 'MtStr', None),
+    (('location_zip',), 'MtAnschriftPLZ', None),
+    (('location_city',), 'MtAnschriftOrt', None),
+    # Kombiniere PLZ und Stadt für MtOrt
+    (('location_city',), 'MtOrt', lambda city, data: f"{data.get('location_zip', '')} {city}".strip()),
+    # Techniker/Mitarbeiter
+    (('technician',), 'MaMatch', None),
+)
+
+# Status-Flags für neue Aufträge
+_AH_STATUS_FLAGS = (('AhOffen', 'true'), ('Erledigt', 'false'), ('AhMobile', 'true'))
+
+# Template-Dateien nach Pfad: (st_mtime_ns, Inhalt); bei geänderter Datei neu gelesen
+_template_file_cache: Dict[str, Tuple[int, str]] = {}
+
+
+@lru_cache(maxsize=8)
+def _parse_cached(template: str) -> Tuple[ET.Element, Tuple[int, ...]]:
+    """Geparstes Template und Indexpfad zum Ah-Element, einmal pro Template-String
+    
+    Der Baum darf nicht verändert werden (vorher kopieren).
+    """
+    root = XMLTemplateService._parse_template(template)
+    
+    # Ah Element finden (Auftrag), ein Durchlauf mit Tag-Vergleich statt XPath mit Fallback
+    for element in root.iter():
+        if element.tag in _AH_TAGS:
+            return root, XMLTemplateService._element_path(root, element)
+    
+    raise ValueError("Kein Ah (Auftrag) Element im Template gefunden")
+
 
 class XMLTemplateService:
     """Service für die Verarbeitung von Taifun XML-Templates"""
@@ -15,12 +89,25 @@ class XMLTemplateService:
     def load_template_from_file(template_path: str) -> str:
         """Lädt XML-Template aus Datei"""
         try:
+            mtime_ns = os.stat(template_path).st_mtime_ns
+            cached = _template_file_cache.get(template_path)
+            if cached is not None and cached[0] == mtime_ns:
+                # Dasselbe String-Objekt trifft auch den Parse-Cache ohne Vergleich des Inhalts
+                return cached[1]
+            
             with open(template_path, 'r', encoding='windows-1252') as file:
-                return file.read()
+                content = file.read()
+            _template_file_cache[template_path] = (mtime_ns, content)
+            return content
         except Exception as e:
             logger.error(f"Failed to load template from {template_path}: {e}")
             raise
     
+    @staticmethod
+    def get_template_root(template_path: str) -> ET.Element:
+        """Liefert eine eigene Kopie des geparsten Templates aus Datei"""
+        return copy.deepcopy(_parse_cached(XMLTemplateService.load_template_from_file(template_path))[0])
+    
     @staticmethod
     def populate_work_order_template(
         empty_template: str, 
@@ -36,152 +123,202 @@ class XMLTemplateService:
             work_order_nr: Optional - spezifische Auftragsnummer
         """
         try:
-            # XML parsen
-            root = ET.fromstring(empty_template)
-            
-            # Namespace definieren
-            namespace = {'taifun': 'urn:taifun-software.de:schema:TAIFUN'}
-            
-            # Ah Element finden (Auftrag)
-            ah_element = root.find('.//taifun:Ah', namespace)
-            if ah_element is None:
-                ah_element = root.find('.//Ah')  # Fallback ohne namespace
-            
-            if ah_element is None:
-                raise ValueError("Kein Ah (Auftrag) Element im Template gefunden")
-            
-            # Aktuelle Zeit für Timestamps
-            now = datetime.now()
-            current_date = now.strftime('%Y-%m-%d')
-            current_time = now.strftime('%H:%M:%S.%f')[:-4]
-            
-            # Basis-Auftragsdaten setzen
-            XMLTemplateService._set_element_text(ah_element, 'DateAdd', current_date)
-            XMLTemplateService._set_element_text(ah_element, 'TimeAdd', current_time)
-            XMLTemplateService._set_element_text(ah_element, 'DatePut', current_date)
-            XMLTemplateService._set_element_text(ah_element, 'TimePut', current_time)
-            XMLTemplateService._set_element_text(ah_element, 'Date', current_date)
-            XMLTemplateService._set_element_text(ah_element, 'DateDesc', current_date)
-            XMLTemplateService._set_element_text(ah_element, 'Time', now.strftime('%H:%M:00'))
-            
-            # Auftragsnummer generieren falls nicht gegeben
-            if not work_order_nr:
-                work_order_nr = f"A{now.strftime('%y%m%d')}{now.strftime('%H%M')}"
-            
-            XMLTemplateService._set_element_text(ah_element, 'Nr', work_order_nr)
-            XMLTemplateService._set_element_text(ah_element, 'NrDesc', work_order_nr)
-            
-            # Extrahierte Daten einsetzen
-            XMLTemplateService._populate_extracted_data(ah_element, extracted_data)
-            
-            # XML formatieren und zurückgeben
-            return XMLTemplateService._format_xml(root)
+            # Template nur einmal parsen, pro Auftrag wird die Kopie befüllt
+            template_root, ah_path = _parse_cached(empty_template)
+            return XMLTemplateService._populate_copy(
+                template_root, ah_path, extracted_data, work_order_nr, XMLTemplateService._now_formatted()
+            )
             
         except Exception as e:
             logger.error(f"Failed to populate template: {e}")
             raise
     
     @staticmethod
-    def _populate_extracted_data(ah_element: ET.Element, data: Dict[str, Any]):
-        """Setzt die extrahierten Daten in das XML ein"""
-        
-        # Problem-Beschreibung
-        if 'problem_description' in data:
-            XMLTemplateService._set_element_text(ah_element, 'Info', data['problem_description'])
+    def populate_many(
+        empty_template: str,
+        orders: List[Tuple[Dict[str, Any], Optional[str]]]
+    ) -> List[str]:
+        """
+        Füllt das Template für mehrere Aufträge (extrahierte Daten, Auftragsnummer oder None)
         
-        # Detaillierte Beschreibung
-        if 'detailed_description' in data:
-            XMLTemplateService._set_element_text(ah_element, 'VortextTxt', data['detailed_description'])
-        elif 'problem_description' in data:
-            # Fallback: verwende Kurzbeschreibung auch für Details
-            XMLTemplateService._set_element_text(ah_element, 'VortextTxt', data['problem_description'])
+        Template-Parsing und Zeitstempel werden einmal für den ganzen Stapel erzeugt.
+        """
+        try:
+            template_root, ah_path = _parse_cached(empty_template)
+            timestamps = XMLTemplateService._now_formatted()
+            return [
+                XMLTemplateService._populate_copy(template_root, ah_path, extracted_data, work_order_nr, timestamps)
+                for extracted_data, work_order_nr in orders
+            ]
+            
+        except Exception as e:
+            logger.error(f"Failed to populate templates: {e}")
+            raise
+    
+    @staticmethod
+    def _populate_copy(
+        template_root: ET.Element,
+        ah_path: Tuple[int, ...],
+        extracted_data: Dict[str, Any],
+        work_order_nr: Optional[str],
+        timestamps: Tuple[str, str, str, str]
+    ) -> str:
+        """Befüllt eine Kopie des geparsten Templates und gibt das formatierte XML zurück"""
+        root = copy.deepcopy(template_root)
         
-        # Bestellnummer
-        if 'order_number' in data:
-            XMLTemplateService._set_element_text(ah_element, 'BestellNr', str(data['order_number']))
+        # Ah Element der Kopie über den vorberechneten Indexpfad
+        ah_element = root
+        for index in ah_path:
+            ah_element = ah_element[index]
         
-        # Terminplanung
-        if 'appointment_date' in data:
-            XMLTemplateService._set_element_text(ah_element, 'DateTermin', data['appointment_date'])
-            XMLTemplateService._set_element_text(ah_element, 'Date2', data['appointment_date'])
+        # Kinder von Ah einmal indizieren statt für jedes Feld Ah.find() aufzurufen
+        child_index = XMLTemplateService._index_children(ah_element)
         
-        if 'appointment_time_from' in data:
-            XMLTemplateService._set_element_text(ah_element, 'TimeVon', data['appointment_time_from'])
+        # Aktuelle Zeit für Timestamps
+        current_date, current_time, time_hm, nr_token = timestamps
         
-        if 'appointment_time_to' in data:
-            XMLTemplateService._set_element_text(ah_element, 'TimeBis', data['appointment_time_to'])
+        # Basis-Auftragsdaten setzen
+        for tag_name, value in (
+            ('DateAdd', current_date),
+            ('TimeAdd', current_time),
+            ('DatePut', current_date),
+            ('TimePut', current_time),
+            ('Date', current_date),
+            ('DateDesc', current_date),
+            ('Time', time_hm),
+        ):
+            XMLTemplateService._set_element_text(ah_element, child_index, tag_name, value)
         
-        # Objekt/Standort-Informationen
-        if 'location_name' in data:
-            XMLTemplateService._set_element_text(ah_element, 'MtName1', data['location_name'])
+        # Auftragsnummer generieren falls nicht gegeben
+        if not work_order_nr:
+            work_order_nr = f"A{nr_token}"
         
-        if 'location_street' in data:
-            XMLTemplateService._set_element_text(ah_element, 'MtAnschriftStr', data['location_street'])
-            XMLTemplateService._set_element_text(ah_element, 'MtStr', data['location_street'])
+        XMLTemplateService._set_element_text(ah_element, child_index, 'Nr', work_order_nr)
+        XMLTemplateService._set_element_text(ah_element, child_index, 'NrDesc', work_order_nr)
         
-        if 'location_zip' in data:
-            XMLTemplateService._set_element_text(ah_element, 'MtAnschriftPLZ', data['location_zip'])
+        # Extrahierte Daten einsetzen
+        XMLTemplateService._populate_extracted_data(ah_element, child_index, extracted_data)
         
-        if 'location_city' in data:
-            XMLTemplateService._set_element_text(ah_element, 'MtAnschriftOrt', data['location_city'])
-            # Kombiniere PLZ und Stadt für MtOrt
-            zip_code = data.get('location_zip', '')
-            XMLTemplateService._set_element_text(ah_element, 'MtOrt', f"{zip_code} {data['location_city']}".strip())
+        # XML formatieren und zurückgeben
+        return XMLTemplateService._format_xml(root)
+    
+    @staticmethod
+    def _element_path(root: ET.Element, target: ET.Element) -> Tuple[int, ...]:
+        """Indexpfad von root zu target (Kind-Positionen), Suche in Dokumentreihenfolge"""
+        stack = [(root, ())]
+        while stack:
+            element, path = stack.pop()
+            if element is target:
+                return path
+            stack.extend((child, path + (index,)) for index, child in reversed(list(enumerate(element))))
+        raise ValueError("Element nicht im Baum gefunden")
+    
+    @staticmethod
+    def _now_formatted() -> Tuple[str, str, str, str]:
+        """Aktuelle Ortszeit als (Datum, Uhrzeit mit Hundertsteln, Uhrzeit HH:MM:00, Token für Auftragsnummer)"""
+        ns = time.time_ns()
+        tm = time.localtime(ns // 1_000_000_000)
+        hundredths = (ns // 10_000_000) % 100
+        return (
+            f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}",
+            f"{tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d}.{hundredths:02d}",
+            f"{tm.tm_hour:02d}:{tm.tm_min:02d}:00",
+            f"{tm.tm_year % 100:02d}{tm.tm_mon:02d}{tm.tm_mday:02d}{tm.tm_hour:02d}{tm.tm_min:02d}",
+        )
+    
+    @staticmethod
+    def _parse_template(template: str) -> ET.Element:
+        """Parst ein Template aus einem String"""
+        if LXML_ETREE:
+            # lxml lehnt str mit Encoding-Deklaration ab; der Parser-Encoding überschreibt die Deklaration
+            parser = getattr(_parser_local, 'parser', None)
+            if parser is None:
+                parser = _parser_local.parser = ET.XMLParser(encoding='utf-8', remove_blank_text=True)
+            return ET.fromstring(template.encode('utf-8'), parser)
+        # xml.etree.ElementTree nutzt bereits den C-Beschleuniger (_elementtree)
+        return ET.fromstring(template)
+    
+    @staticmethod
+    def _populate_extracted_data(ah_element: ET.Element, child_index: Dict[str, ET.Element], data: Dict[str, Any]):
+        """Setzt die extrahierten Daten in das XML ein"""
+        set_text = partial(XMLTemplateService._set_element_text, ah_element, child_index)
         
-        # Techniker/Mitarbeiter
-        if 'technician' in data:
-            XMLTemplateService._set_element_text(ah_element, 'MaMatch', data['technician'])
+        for data_keys, tag_name, convert in _AH_FIELD_MAP:
+            # Der erste vorhandene Schlüssel gewinnt (z.B. Kurzbeschreibung als Fallback für Details)
+            for key in data_keys:
+                if key in data:
+                    value = data[key]
+                    set_text(tag_name, convert(value, data) if convert else value)
+                    break
         
         # Kontaktinformationen
         if 'contact_person' in data:
             # Füge Kontaktperson zur VortextTxt hinzu
-            current_text = XMLTemplateService._get_element_text(ah_element, 'VortextTxt') or ''
-            contact_info = f"\nMeldender: {data['contact_person']}"
+            parts = [
+                XMLTemplateService._get_element_text(ah_element, child_index, 'VortextTxt') or '',
+                f"\nMeldender: {data['contact_person']}"
+            ]
             if 'contact_phone' in data:
-                contact_info += f"\nTelefon: {data['contact_phone']}"
-            XMLTemplateService._set_element_text(ah_element, 'VortextTxt', current_text + contact_info)
+                parts.append(f"\nTelefon: {data['contact_phone']}")
+            set_text('VortextTxt', ''.join(parts))
         
         # Status-Flags setzen
-        XMLTemplateService._set_element_text(ah_element, 'AhOffen', 'true')
-        XMLTemplateService._set_element_text(ah_element, 'Erledigt', 'false')
-        XMLTemplateService._set_element_text(ah_element, 'AhMobile', 'true')
+        for tag_name, value in _AH_STATUS_FLAGS:
+            set_text(tag_name, value)
+    
+    @staticmethod
+    def _index_children(parent: ET.Element) -> Dict[str, ET.Element]:
+        """Indiziert die Kind-Elemente nach lokalem Namen (ohne Namespace, z.B. 'Nr')"""
+        return {
+            XMLTemplateService._local_name(child.tag): child
+            for child in parent if isinstance(child.tag, str)
+        }
     
     @staticmethod
-    def _set_element_text(parent: ET.Element, tag_name: str, value: str):
+    def _set_element_text(parent: ET.Element, child_index: Dict[str, ET.Element], tag_name: str, value: str):
         """Setzt den Text eines XML-Elements"""
-        element = parent.find(tag_name)
-        if element is not None:
-            element.text = str(value) if value is not None else ''
-        else:
-            # Element erstellen falls es nicht existiert
-            new_element = ET.SubElement(parent, tag_name)
-            new_element.text = str(value) if value is not None else ''
+        element = child_index.get(tag_name)
+        if element is None:
+            # Element erstellen falls es nicht existiert, im Namespace des Ah-Elements
+            element = child_index[tag_name] = ET.SubElement(
+                parent, XMLTemplateService._namespace_of(parent) + tag_name
+            )
+        element.text = xml_text(value) if value is not None else ''
     
     @staticmethod
-    def _get_element_text(parent: ET.Element, tag_name: str) -> Optional[str]:
+    def _get_element_text(parent: ET.Element, child_index: Dict[str, ET.Element], tag_name: str) -> Optional[str]:
         """Holt den Text eines XML-Elements"""
-        element = parent.find(tag_name)
+        element = child_index.get(tag_name)
         return element.text if element is not None else None
     
+    @staticmethod
+    def _namespace_of(element: ET.Element) -> str:
+        """Namespace-Präfix eines Elements in Clark-Notation ('{uri}') oder ''"""
+        return element.tag[:element.tag.find('}') + 1]
+    
+    @staticmethod
+    def _local_name(tag: str) -> str:
+        """Tag ohne Namespace ('{uri}Nr' -> 'Nr')"""
+        return tag.rsplit('}', 1)[-1]
+    
     @staticmethod
     def _format_xml(root: ET.Element) -> str:
         """Formatiert XML für bessere Lesbarkeit"""
         try:
-            # XML zu String konvertieren
-            rough_string = ET.tostring(root, encoding='unicode')
-            
-            # Mit minidom formatieren
-            reparsed = minidom.parseString(rough_string)
-            formatted = reparsed.toprettyxml(indent="  ", encoding=None)
-            
-            # Erste Zeile (XML-Deklaration) entfernen und durch windows-1252 ersetzen
-            lines = formatted.split('\n')[1:]  # Erste Zeile entfernen
-            formatted_content = '\n'.join(lines)
-            
-            # Korrekte XML-Deklaration hinzufügen
-            xml_declaration = '<?xml version="1.0" encoding="windows-1252"?>'
+            if LXML_ETREE:
+                # Deklaration und Baum direkt in einen Puffer schreiben statt Strings zu verketten
+                # (lxml schreibt die Deklaration mit einfachen Anführungszeichen, daher selbst)
+                buffer = io.BytesIO()
+                buffer.write(_XML_DECLARATION_LINE)
+                # Nicht darstellbare Zeichen werden als Zeichenreferenzen ausgegeben
+                ET.ElementTree(root).write(buffer, pretty_print=True, encoding='windows-1252', xml_declaration=False)
+                # Abschließenden Zeilenumbruch von pretty_print im Puffer abschneiden
+                buffer.truncate(buffer.tell() - 1)
+                return buffer.getvalue().decode('windows-1252')
             
-            return xml_declaration + formatted_content
+            # Baum direkt einrücken statt über minidom neu zu parsen und auszugeben
+            ET.indent(root, space='  ')
+            return f"{_XML_DECLARATION}\n{ET.tostring(root, encoding='unicode')}"
             
         except Exception as e:
             logger.warning(f"XML formatting failed, returning unformatted: {e}")
@@ -196,34 +333,70 @@ class XMLTemplateService:
             Dict mit validation_result und ggf. Fehlermeldungen
         """
         try:
-            root = ET.fromstring(xml_content)
-            
             validation_result = {
                 'valid': True,
                 'errors': [],
                 'warnings': []
             }
             
-            # Prüfe Root-Element
-            if root.tag != 'AhList':
+            # Ereignisbasiert parsen; sobald das erste Ah geprüft ist, nur noch auf Wohlgeformtheit
+            root_tag = None
+            has_namespace = False
+            ah_depth = None
+            ah_done = False
+            ah_fields = set()
+            depth = 0
+            
+            parser = ET.XMLPullParser(events=('start', 'end'))
+            for offset in range(0, len(xml_content), _VALIDATE_CHUNK_CHARS):
+                parser.feed(xml_content[offset:offset + _VALIDATE_CHUNK_CHARS])
+                if ah_done and has_namespace:
+                    # Alles Nötige ist bekannt: Events nur noch verwerfen und Speicher freigeben
+                    for event, element in parser.read_events():
+                        if event == 'end':
+                            element.clear()
+                    continue
+                for event, element in parser.read_events():
+                    tag = element.tag
+                    if not isinstance(tag, str):
+                        continue  # Kommentare/Processing Instructions (lxml)
+                    if event == 'start':
+                        depth += 1
+                        if root_tag is None:
+                            root_tag = tag
+                        if not has_namespace and tag.startswith(_TAIFUN_PREFIX):
+                            has_namespace = True
+                        if ah_depth is None and tag in _AH_TAGS:
+                            ah_depth = depth
+                        elif not ah_done and ah_depth is not None and depth == ah_depth + 1:
+                            ah_fields.add(XMLTemplateService._local_name(tag))
+                    else:
+                        if not ah_done and depth == ah_depth:
+                            ah_done = True
+                        depth -= 1
+                        element.clear()
+            # Immer bis zum Ende lesen: close() meldet unvollständige Dokumente als ParseError
+            parser.close()
+            
+            # Prüfe Root-Element (mit oder ohne Taifun-Namespace)
+            if root_tag not in ('AhList', _TAIFUN_PREFIX + 'AhList'):
                 validation_result['errors'].append("Root-Element sollte 'AhList' sein")
                 validation_result['valid'] = False
             
-            # Prüfe Namespace
-            if 'urn:taifun-software.de:schema:TAIFUN' not in xml_content:
+            # Prüfe Namespace anhand der gelesenen Tags statt den Text erneut zu durchsuchen
+            if not has_namespace:
                 validation_result['warnings'].append("Taifun-Namespace fehlt")
             
             # Prüfe Ah-Element
-            ah_element = root.find('.//Ah')
-            if ah_element is None:
+            if ah_depth is None:
                 validation_result['errors'].append("Kein Ah (Auftrag) Element gefunden")
                 validation_result['valid'] = False
             else:
-                # Prüfe wichtige Felder
-                required_fields = ['Nr', 'Date', 'Info']
-                for field in required_fields:
-                    if ah_element.find(field) is None:
-                        validation_result['warnings'].append(f"Feld '{field}' fehlt")
+                # Prüfe wichtige Felder; im Normalfall sind alle vorhanden, dann genügt ein Mengenvergleich
+                if not ah_fields.issuperset(_AH_REQUIRED_FIELDS):
+                    validation_result['warnings'].extend(
+                        f"Feld '{field}' fehlt" for field in _AH_REQUIRED_FIELDS if field not in ah_fields
+                    )
             
             return validation_result
             
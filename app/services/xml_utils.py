@@ -0,0 +1,10 @@
+from typing import Any
+import re
+
+# Characters XML 1.0 does not allow in text (C0 controls except tab/newline/CR, surrogates, U+FFFE/FFFF)
+_INVALID_XML_CHARS_RE = re.compile('[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+
+
+def xml_text(value: Any) -> str:
+    """Text for an XML element, without characters XML does not allow (lxml rejects them)"""
+    return _INVALID_XML_CHARS_RE.sub('', str(value))
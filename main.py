@@ -12,6 +12,8 @@ from app.routers import (
     ssh_routes,
 )
 from app.services.playwright_service import playwright_service
+from app.services.ssh_transfer_service import SSHTransferService
+from app.services.transfer_service import TransferService
 
 # Setup logging
 logger = setup_logging()
@@ -60,6 +62,8 @@ async def shutdown_event():
     """Clean up services on shutdown"""
     try:
         await playwright_service.stop()
+        SSHTransferService.close_connections()
+        await TransferService.close_http_client()
         logger.info("Application shutdown completed successfully")
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
@@ -1,19 +1,11 @@
 import json
-import sys
-from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
 
-# Ensure project root is on sys.path
-sys.path.append(str(Path(__file__).resolve().parents[2]))
-
-
-@pytest.fixture()
-def client(monkeypatch):
-    # Set required environment variable before importing the app
-    monkeypatch.setenv("ENCRYPTION_PASSWORD", "test")
 
+@pytest.fixture(scope="session")
+def app_instance():
     from main import app
     from app.services.playwright_service import playwright_service
 
@@ -23,11 +15,22 @@ def client(monkeypatch):
     async def fake_stop():
         pass
 
-    monkeypatch.setattr(playwright_service, "start", fake_start)
-    monkeypatch.setattr(playwright_service, "stop", fake_stop)
-    monkeypatch.setattr(playwright_service, "is_available", lambda: True)
-
-    with TestClient(app) as client:
+    # Session-scoped, so patch directly instead of through the monkeypatch fixture
+    originals = {name: getattr(playwright_service, name) for name in ("start", "stop", "is_available")}
+    playwright_service.start = fake_start
+    playwright_service.stop = fake_stop
+    playwright_service.is_available = lambda: True
+    try:
+        yield app
+    finally:
+        for name, original in originals.items():
+            setattr(playwright_service, name, original)
+
+
+@pytest.fixture(scope="session")
+def client(app_instance):
+    # Startup/shutdown run once for all endpoint tests
+    with TestClient(app_instance) as client:
         yield client
 
 
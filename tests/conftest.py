@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# Runs once before any test module is imported: make the app importable and
+# provide the password the module-level encryption service needs at import time
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ENCRYPTION_PASSWORD", "test-password")
@@ -1,10 +1,3 @@
-import os
-import sys
-from pathlib import Path
-
-sys.path.append(str(Path(__file__).resolve().parents[2]))
-os.environ['ENCRYPTION_PASSWORD'] = 'test-password'
-
 from app.database import models
 
 import pytest
@@ -82,3 +75,24 @@ def test_ssh_route_crud(db):
 
     assert db.delete_ssh_route(route_db_id)
     assert db.get_ssh_route('route1') is None
+
+
+def test_failed_credential_decrypt_is_not_cached(monkeypatch):
+    encrypted = models.encryption_service.encrypt('secret')
+    route = models.SSHTransferRoute(route_id='route1', password=encrypted)
+    decrypt = models.encryption_service.decrypt
+    calls = []
+
+    def flaky_decrypt(value):
+        calls.append(value)
+        if len(calls) == 1:
+            raise ValueError('temporary failure')
+        return decrypt(value)
+
+    monkeypatch.setattr(models.encryption_service, 'decrypt', flaky_decrypt)
+    models._decrypt_credentials.cache_clear()
+
+    assert route.get_decrypted_credentials() == {'password': '', 'private_key': ''}
+    assert route.get_decrypted_credentials() == {'password': 'secret', 'private_key': ''}
+    assert route.get_decrypted_credentials()['password'] == 'secret'
+    assert len(calls) == 2
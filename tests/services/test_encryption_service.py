@@ -1,28 +1,25 @@
-import os
-import sys
+import pytest
 
-# Provide password for module-level encryption_service
-os.environ.setdefault("ENCRYPTION_PASSWORD", "testpassword")
+from app.services.encryption_service import EncryptionService
 
-# Ensure repository root is on the Python path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from app.services.encryption_service import EncryptionService
+@pytest.fixture(scope="module")
+def enc_service():
+    # Key derivation (PBKDF2) runs once for the whole module
+    return EncryptionService(password="testpassword")
 
 
-def test_encrypt_decrypt_roundtrip():
-    service = EncryptionService(password="testpassword")
+def test_encrypt_decrypt_roundtrip(enc_service):
     plaintext = "Hello, World!"
 
-    encrypted = service.encrypt(plaintext)
+    encrypted = enc_service.encrypt(plaintext)
     assert encrypted != plaintext
 
-    decrypted = service.decrypt(encrypted)
+    decrypted = enc_service.decrypt(encrypted)
     assert decrypted == plaintext
 
 
-def test_encrypt_decrypt_dict_fields():
-    service = EncryptionService(password="testpassword")
+def test_encrypt_decrypt_dict_fields(enc_service):
     original = {
         "username": "admin",
         "password": "secret",
@@ -30,7 +27,7 @@ def test_encrypt_decrypt_dict_fields():
     }
     fields = ["password", "token"]
 
-    encrypted = service.encrypt_dict(original, fields)
+    encrypted = enc_service.encrypt_dict(original, fields)
 
     # encrypted fields should change
     assert encrypted["password"] != original["password"]
@@ -38,6 +35,6 @@ def test_encrypt_decrypt_dict_fields():
     # untouched field should stay the same
     assert encrypted["username"] == original["username"]
 
-    decrypted = service.decrypt_dict(encrypted, fields)
+    decrypted = enc_service.decrypt_dict(encrypted, fields)
 
     assert decrypted == original
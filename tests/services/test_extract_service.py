@@ -1,13 +1,7 @@
 import pytest
 from unittest.mock import patch
-import sys
-from pathlib import Path
-import os
 import asyncio
 
-sys.path.append(str(Path(__file__).resolve().parents[2]))
-os.environ.setdefault("ENCRYPTION_PASSWORD", "test-password")
-
 from app.services.extract_service import ExtractService
 
 
@@ -1,11 +1,23 @@
-import sys
-from pathlib import Path
+import xml.etree.ElementTree as StdET
 
 import pytest
 
-# Ensure the application package is importable when running tests directly
-sys.path.append(str(Path(__file__).resolve().parents[2]))
-from app.services.html_transform_service import HTMLToXMLTransformService
+from app.services.html_transform_service import ET, HTMLToXMLTransformService
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+
+
+def _assert_elements_equal(expected, actual):
+    assert actual.tag == expected.tag
+    assert (actual.text or "").strip() == (expected.text or "").strip()
+    assert len(actual) == len(expected), f"children of <{expected.tag}> differ"
+    for expected_child, actual_child in zip(expected, actual):
+        _assert_elements_equal(expected_child, actual_child)
+
+
+def assert_xml_equal(expected_str, actual_str):
+    """Compare two XML documents by tree, ignoring indentation"""
+    _assert_elements_equal(StdET.fromstring(expected_str), StdET.fromstring(actual_str))
 
 
 def test_transform_html_to_xml_with_extract_and_wrap():
@@ -17,11 +29,8 @@ def test_transform_html_to_xml_with_extract_and_wrap():
 
     result = HTMLToXMLTransformService.transform_html_to_xml(html, rules)
 
-    expected = (
-        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
-        "<document>\n<content>Hello World</content>\n</document>"
-    )
-    assert result == expected
+    assert result.startswith(XML_DECLARATION)
+    assert_xml_equal("<document><content>Hello World</content></document>", result)
 
 
 def test_wrap_xml_with_add_metadata():
@@ -35,8 +44,103 @@ def test_wrap_xml_with_add_metadata():
     result = HTMLToXMLTransformService._wrap_xml(data, rule)
 
     expected = (
-        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
-        "<doc>\n<metadata>\n<timestamp>2021-01-01T00:00:00</timestamp>\n"
-        "<length>11</length>\n</metadata>\n<content>Hello World</content>\n</doc>"
+        "<doc><metadata><timestamp>2021-01-01T00:00:00</timestamp><length>11</length></metadata>"
+        "<content>Hello World</content></doc>"
+    )
+    assert result.startswith(XML_DECLARATION)
+    assert_xml_equal(expected, result)
+
+
+def test_default_xml_wrap_flat_matches_tree_output():
+    data = {"title": "A & B", "tags": ["x", "<y>"], "empty": []}
+
+    result = HTMLToXMLTransformService._default_xml_wrap(data)
+
+    root = ET.Element("document")
+    HTMLToXMLTransformService._dict_to_xml(data, root)
+    assert result == HTMLToXMLTransformService._xml_to_string(root)
+
+
+def test_apply_leaf_transforms_runs_fused_rules_in_order():
+    data = {"content": "  <p>Hello</p>   <b>World</b> ", "items": [{"name": " <i>x</i> "}, 3]}
+    transforms = [
+        HTMLToXMLTransformService._tag_transform({}),
+        HTMLToXMLTransformService._whitespace_transform({"normalize": True}),
+    ]
+
+    result = HTMLToXMLTransformService._apply_leaf_transforms(data, transforms)
+
+    assert result == {"content": "Hello World", "items": [{"name": "x"}, 3]}
+
+
+def test_dict_to_xml_keeps_order_for_nested_data():
+    data = {"a": {"b": "1", "c": [{"d": "2"}, "3"]}, "e": "4"}
+    root = ET.Element("document")
+
+    HTMLToXMLTransformService._dict_to_xml(data, root)
+
+    assert [elem.tag for elem in root.iter()] == ["document", "a", "b", "c", "item", "d", "item", "e"]
+    assert [elem.text for elem in root.iter("item")] == [None, "3"]
+
+
+def test_build_taifun_xml_appends_contact_info_to_vortext():
+    data = {"problem_description": "Heizung defekt", "contact_phone": "0123 456789"}
+
+    result = HTMLToXMLTransformService._build_taifun_xml(data, {})
+
+    root = ET.fromstring(result.split("\n", 1)[1])
+    work_order = root.find("WorkOrder")
+    assert [elem.tag for elem in work_order] == ["Info", "VortextTxt"]
+    assert work_order.findtext("VortextTxt") == "Heizung defekt\nTelefon: 0123 456789"
+
+
+def test_build_taifun_xml_sanitizes_additional_keys_and_control_chars():
+    # AdditionalData is only written once there are more entries than Taifun fields
+    data = {f"extra_{i}": i for i in range(10)}
+    data.update({"problem_description": "Heizung\x0b defekt", "2nd contact": "Frau\x0bX"})
+
+    result = HTMLToXMLTransformService._build_taifun_xml(data, {})
+
+    root = ET.fromstring(result.split("\n", 1)[1])
+    assert root.findtext("WorkOrder/Info") == "Heizung defekt"
+    assert root.findtext("AdditionalData/_2nd_contact") == "FrauX"
+
+
+def test_default_xml_wrap_flat_and_tree_agree_on_invalid_names_and_text():
+    flat = {"2nd contact": "a\x0bb", "tags": ["\x00x"]}
+
+    flat_result = HTMLToXMLTransformService._default_xml_wrap(flat)
+    tree_result = HTMLToXMLTransformService._default_xml_wrap({**flat, "nested": {"1x": "c\x0b"}})
+
+    assert_xml_equal("<document><_2nd_contact>ab</_2nd_contact><tags><item>x</item></tags></document>", flat_result)
+    assert_xml_equal(
+        "<document><_2nd_contact>ab</_2nd_contact><tags><item>x</item></tags>"
+        "<nested><_1x>c</_1x></nested></document>",
+        tree_result,
     )
-    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "time_range",
+    ["13:00-15:00", " 13:00 - 15:00 ", "von 13:00 bis 15:00", "13:00-15:00 Uhr"],
+)
+def test_parse_time_range_to_fields(time_range):
+    mapped = {}
+
+    HTMLToXMLTransformService._parse_time_range_to_fields(time_range, ["TimeVon", "TimeBis"], mapped)
+
+    assert mapped == {"TimeVon": "13:00:00", "TimeBis": "15:00:00"}
+
+
+def test_precompile_selectors_warms_selector_cache():
+    from app.services import html_transform_service as html_module
+
+    if html_module.lxml_html is None:
+        pytest.skip("lxml not installed")
+    rules = [{"action": "extract_elements", "selectors": {"title": "h1.precompiled"}}]
+
+    HTMLToXMLTransformService.precompile_selectors(rules)
+
+    hits = html_module._css_selector.cache_info().hits
+    html_module._css_selector("h1.precompiled")
+    assert html_module._css_selector.cache_info().hits == hits + 1
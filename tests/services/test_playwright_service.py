@@ -0,0 +1,188 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services import playwright_service as playwright_module
+from app.services.playwright_service import PlaywrightService
+
+
+def _fake_browser():
+    browser = MagicMock()
+    browser.close = AsyncMock()
+
+    def new_context(**kwargs):
+        context = MagicMock()
+        context.browser = browser
+        context.close = AsyncMock()
+        context.clear_cookies = AsyncMock()
+        context.add_init_script = AsyncMock()
+        context.route = AsyncMock()
+
+        def new_page():
+            page = MagicMock()
+            page.context = context
+            page.close = AsyncMock()
+            page.goto = AsyncMock()
+            page.is_closed = MagicMock(return_value=False)
+            return page
+
+        context.new_page = AsyncMock(side_effect=new_page)
+        return context
+
+    browser.new_context = AsyncMock(side_effect=new_context)
+    return browser
+
+
+def test_context_pool_spreads_pages_over_browsers_and_returns_contexts():
+    browsers = []
+
+    def launch(**kwargs):
+        browsers.append(_fake_browser())
+        return browsers[-1]
+
+    playwright = MagicMock()
+    playwright.chromium.launch = AsyncMock(side_effect=launch)
+    playwright.stop = AsyncMock()
+    starter = MagicMock()
+    starter.start = AsyncMock(return_value=playwright)
+
+    async def run():
+        service = PlaywrightService()
+        used = []
+
+        async def open_page():
+            async with service.new_page() as page:
+                used.append(browsers.index(page.context.browser))
+                await asyncio.sleep(0)
+
+        await service.start()
+        await asyncio.gather(*(open_page() for _ in range(4)))
+        await asyncio.gather(*service._recycle_tasks)
+        pooled = service._pages.qsize()
+        await service.stop()
+        return used, pooled, service.is_available()
+
+    with patch.object(playwright_module, "async_playwright", return_value=starter), \
+            patch.object(playwright_module.settings, "playwright_browser_count", 2), \
+            patch.object(playwright_module.settings, "playwright_context_pool_size", 2):
+        used, pooled, available = asyncio.run(run())
+
+    assert sorted(used) == [0, 0, 1, 1]
+    assert pooled == 4
+    assert available is False
+    assert all(browser.close.await_count == 1 for browser in browsers)
+
+
+def _single_browser_starter(browser):
+    playwright = MagicMock()
+    playwright.chromium.launch = AsyncMock(return_value=browser)
+    playwright.stop = AsyncMock()
+    starter = MagicMock()
+    starter.start = AsyncMock(return_value=playwright)
+    return starter
+
+
+def test_released_page_is_replaced_by_a_fresh_context_in_the_background():
+    browser = _fake_browser()
+
+    async def run():
+        service = PlaywrightService()
+        await service.start()
+        pages, contexts_at_exit = [], []
+        for _ in range(3):
+            async with service.new_page() as page:
+                pages.append(page)
+            contexts_at_exit.append(browser.new_context.await_count)
+            await asyncio.gather(*service._recycle_tasks)
+        await service.stop()
+        return pages, contexts_at_exit
+
+    with patch.object(playwright_module, "async_playwright", return_value=_single_browser_starter(browser)), \
+            patch.object(playwright_module.settings, "playwright_browser_count", 1), \
+            patch.object(playwright_module.settings, "playwright_context_pool_size", 1):
+        pages, contexts_at_exit = asyncio.run(run())
+
+    # Leaving the block does not wait for the replacement context
+    assert contexts_at_exit == [1, 2, 3]
+    # No storage, cache or service worker of one request is visible to the next
+    contexts = [page.context for page in pages]
+    assert len(set(map(id, contexts))) == 3
+    assert all(context.close.await_count == 1 for context in contexts)
+    assert browser.new_context.await_count == 4
+
+
+def test_cancelled_request_returns_its_slot_and_never_reuses_the_page():
+    browser = _fake_browser()
+
+    async def run():
+        service = PlaywrightService()
+        await service.start()
+        entered = asyncio.Event()
+        used = []
+
+        async def hold_page():
+            async with service.new_page() as page:
+                used.append(page)
+                entered.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(hold_page())
+        await entered.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        async with service.new_page() as page:
+            next_page = page
+        await service.stop()
+        return used[0], next_page
+
+    with patch.object(playwright_module, "async_playwright", return_value=_single_browser_starter(browser)), \
+            patch.object(playwright_module.settings, "playwright_browser_count", 1), \
+            patch.object(playwright_module.settings, "playwright_context_pool_size", 1), \
+            patch.object(playwright_module.settings, "playwright_pool_timeout", 1000):
+        used_page, next_page = asyncio.run(run())
+
+    assert next_page is not used_page
+    used_page.context.close.assert_awaited_once()
+
+
+def test_new_page_times_out_when_all_slots_are_taken():
+    browser = _fake_browser()
+
+    async def run():
+        service = PlaywrightService()
+        await service.start()
+        try:
+            async with service.new_page():
+                with pytest.raises(RuntimeError, match="available"):
+                    async with service.new_page():
+                        pass
+        finally:
+            await service.stop()
+
+    with patch.object(playwright_module, "async_playwright", return_value=_single_browser_starter(browser)), \
+            patch.object(playwright_module.settings, "playwright_browser_count", 1), \
+            patch.object(playwright_module.settings, "playwright_context_pool_size", 1), \
+            patch.object(playwright_module.settings, "playwright_pool_timeout", 10):
+        asyncio.run(run())
+
+
+def test_failed_start_closes_what_was_started():
+    browser = _fake_browser()
+    starter = _single_browser_starter(browser)
+    playwright = starter.start.return_value
+    playwright.chromium.launch = AsyncMock(side_effect=[browser, RuntimeError("launch failed")])
+
+    async def run():
+        service = PlaywrightService()
+        await service.start()
+        return service
+
+    with patch.object(playwright_module, "async_playwright", return_value=starter), \
+            patch.object(playwright_module.settings, "playwright_browser_count", 2):
+        service = asyncio.run(run())
+
+    assert service.is_available() is False
+    assert service.playwright is None
+    browser.close.assert_awaited_once()
+    playwright.stop.assert_awaited_once()
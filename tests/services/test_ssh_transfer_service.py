@@ -1,22 +1,25 @@
-import os
 import io
 import asyncio
-import sys
-from pathlib import Path
+import importlib
 from unittest.mock import MagicMock
-import subprocess
-
-sys.path.append(str(Path(__file__).resolve().parents[2]))
 
 import pytest
 import paramiko
+from paramiko.ed25519key import Ed25519Key
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
 
-# Ensure encryption service initializes
-os.environ.setdefault("ENCRYPTION_PASSWORD", "testpassword")
-
+from app.services import ssh_transfer_service
 from app.services.ssh_transfer_service import SSHTransferService, etl_db, paramiko as ssh_paramiko
 
 
+@pytest.fixture(autouse=True)
+def _empty_ssh_caches():
+    SSHTransferService.invalidate_routes()
+    yield
+    SSHTransferService.invalidate_routes()
+
+
 class MockRoute:
     def __init__(self):
         self.route_id = "route1"
@@ -36,25 +39,84 @@ def test_transfer_xml_file_success(monkeypatch):
     ssh_client = MagicMock()
     sftp_client = MagicMock()
     ssh_client.open_sftp.return_value = sftp_client
-    remote_file = MagicMock()
-    sftp_client.open.return_value.__enter__.return_value = remote_file
-
-    class Stat:
-        st_size = 15
-
-    sftp_client.stat.return_value = Stat()
-
     monkeypatch.setattr(ssh_paramiko, "SSHClient", lambda: ssh_client)
-    monkeypatch.setattr(SSHTransferService, "_ensure_remote_directory", MagicMock())
+    monkeypatch.setattr(SSHTransferService, "_ensure_connection_directory", MagicMock())
 
     content = "<data>ok</data>"
     result = asyncio.run(SSHTransferService.transfer_xml_file(content, "route1", filename="test.xml"))
 
     assert result["success"] is True
     assert result["remote_path"] == "/remote/test.xml"
-    remote_file.write.assert_called_once_with(content)
+    uploaded, remote_path = sftp_client.putfo.call_args.args
+    assert uploaded.getvalue() == content.encode('utf-8')
+    assert remote_path == "/remote/test.xml"
     ssh_client.connect.assert_called_once()
-    sftp_client.stat.assert_called_once_with("/remote/test.xml")
+    assert result["file_size"] == len(content)
+    sftp_client.stat.assert_not_called()
+
+
+def test_transfer_reuses_pooled_connection(monkeypatch):
+    route = MockRoute()
+    monkeypatch.setattr(etl_db, "get_ssh_route", lambda rid: route)
+
+    ssh_client = MagicMock()
+    sftp_client = MagicMock()
+    ssh_client.open_sftp.return_value = sftp_client
+    ssh_client.get_transport.return_value.is_active.return_value = True
+    connect_calls = []
+    stdout = MagicMock()
+    stdout.channel.recv_exit_status.return_value = 0
+    ssh_client.exec_command.return_value = (MagicMock(), stdout, MagicMock())
+    monkeypatch.setattr(ssh_paramiko, "SSHClient", lambda: connect_calls.append(1) or ssh_client)
+
+    for name in ("a.xml", "b.xml"):
+        result = asyncio.run(SSHTransferService.transfer_xml_file("<a/>", "route1", filename=name))
+        assert result["success"] is True
+
+    assert len(connect_calls) == 1
+    ssh_client.open_sftp.assert_called_once()
+    # Target directory is created with one `mkdir -p` for the pooled connection
+    ssh_client.exec_command.assert_called_once_with("mkdir -p /remote", timeout=30)
+    ssh_client.close.assert_not_called()
+
+    SSHTransferService.close_connections("route1")
+    ssh_client.close.assert_called_once()
+
+
+def test_transfer_xml_batch_single_session(monkeypatch):
+    route = MockRoute()
+    monkeypatch.setattr(etl_db, "get_ssh_route", lambda rid: route)
+
+    ssh_client = MagicMock()
+    sftp_client = MagicMock()
+    ssh_client.open_sftp.return_value = sftp_client
+    monkeypatch.setattr(ssh_paramiko, "SSHClient", lambda: ssh_client)
+    monkeypatch.setattr(SSHTransferService, "_ensure_connection_directory", MagicMock())
+
+    items = [("one.xml", "<a/>"), ("two", "<b/>")]
+    result = asyncio.run(SSHTransferService.transfer_xml_batch("route1", items))
+
+    assert result["success"] is True
+    assert [t["remote_path"] for t in result["transfers"]] == ["/remote/one.xml", "/remote/two.xml"]
+    ssh_client.connect.assert_called_once()
+    assert sftp_client.putfo.call_count == 2
+
+
+def test_transfer_xml_file_verify_uses_confirmed_size(monkeypatch):
+    route = MockRoute()
+    monkeypatch.setattr(etl_db, "get_ssh_route", lambda rid: route)
+
+    ssh_client = MagicMock()
+    sftp_client = MagicMock()
+    ssh_client.open_sftp.return_value = sftp_client
+    sftp_client.putfo.return_value.st_size = 42
+    monkeypatch.setattr(ssh_paramiko, "SSHClient", lambda: ssh_client)
+    monkeypatch.setattr(SSHTransferService, "_ensure_connection_directory", MagicMock())
+
+    result = asyncio.run(SSHTransferService.transfer_xml_file("<a/>", "route1", filename="v.xml", verify=True))
+
+    assert result["file_size"] == 42
+    assert sftp_client.putfo.call_args.kwargs["confirm"] is True
 
 
 def test_transfer_xml_file_route_missing(monkeypatch):
@@ -70,39 +132,67 @@ def _key_to_str(key):
     return buf.getvalue()
 
 
-def _generate_ed25519_key_str():
-    import tempfile
-    tmpdir = tempfile.mkdtemp()
-    path = os.path.join(tmpdir, 'key')
-    subprocess.run(['ssh-keygen','-t','ed25519','-f',path,'-N',''], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    with open(path) as f:
-        key = f.read()
-    os.remove(path)
-    os.remove(path + '.pub')
-    os.rmdir(tmpdir)
-    return key
+# Key generation is slow; every loading test shares one key per type
+@pytest.fixture(scope="session")
+def rsa_key_str():
+    return _key_to_str(paramiko.RSAKey.generate(1024))
 
 
-def test_load_private_key_rsa():
-    key_str = _key_to_str(paramiko.RSAKey.generate(1024))
-    loaded = SSHTransferService._load_private_key(key_str)
-    assert isinstance(loaded, paramiko.RSAKey)
+# paramiko 4 dropped DSA support
+DSSKey = getattr(paramiko, "DSSKey", None)
 
 
-def test_load_private_key_ed25519():
-    key_str = _generate_ed25519_key_str()
-    loaded = SSHTransferService._load_private_key(key_str)
-    from paramiko.ed25519key import Ed25519Key
-    assert isinstance(loaded, Ed25519Key)
+@pytest.fixture(scope="session")
+def dss_key_str():
+    return _key_to_str(DSSKey.generate(1024))
 
 
-def test_load_private_key_ecdsa():
-    key_str = _key_to_str(paramiko.ECDSAKey.generate(bits=256))
-    loaded = SSHTransferService._load_private_key(key_str)
-    assert isinstance(loaded, paramiko.ECDSAKey)
+@pytest.fixture(scope="session")
+def ecdsa_key_str():
+    return _key_to_str(paramiko.ECDSAKey.generate(bits=256))
+
 
+@pytest.fixture(scope="session")
+def ed25519_key_str():
+    # paramiko cannot generate Ed25519 keys, cryptography writes the OpenSSH format in-process
+    key = ed25519.Ed25519PrivateKey.generate()
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.OpenSSH,
+        serialization.NoEncryption(),
+    ).decode()
 
-def test_load_private_key_dss():
-    key_str = _key_to_str(paramiko.DSSKey.generate(1024))
+
+@pytest.mark.parametrize(
+    "key_fixture,expected_cls",
+    [
+        ("rsa_key_str", paramiko.RSAKey),
+        ("ed25519_key_str", Ed25519Key),
+        ("ecdsa_key_str", paramiko.ECDSAKey),
+        pytest.param("dss_key_str", DSSKey, marks=pytest.mark.skipif(DSSKey is None, reason="no DSA support")),
+    ],
+)
+def test_load_private_key(request, key_fixture, expected_cls):
+    key_str = request.getfixturevalue(key_fixture)
     loaded = SSHTransferService._load_private_key(key_str)
-    assert isinstance(loaded, paramiko.DSSKey)
+    assert isinstance(loaded, expected_cls)
+    assert SSHTransferService._load_private_key(key_str) is loaded
+
+
+def test_load_private_key_probes_key_types_when_type_unknown(monkeypatch, ed25519_key_str):
+    # Unreadable openssh key type: the loader falls back to trying the key classes
+    monkeypatch.setattr(ssh_transfer_service, "_openssh_key_class", lambda content: None)
+    loaded = SSHTransferService._load_private_key(ed25519_key_str)
+    assert isinstance(loaded, Ed25519Key)
+
+
+def test_module_loads_without_dss_support(monkeypatch, rsa_key_str):
+    monkeypatch.delattr(paramiko, "DSSKey", raising=False)
+    try:
+        module = importlib.reload(ssh_transfer_service)
+        assert "ssh-dss" not in module._OPENSSH_KEY_CLASSES
+        assert module._FALLBACK_KEY_CLASSES[-1] is paramiko.ECDSAKey
+        assert isinstance(module._cached_pkey(rsa_key_str), paramiko.RSAKey)
+    finally:
+        monkeypatch.undo()
+        importlib.reload(ssh_transfer_service)
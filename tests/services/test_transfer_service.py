@@ -1,17 +1,15 @@
 import json
 import pytest
-import sys
-from pathlib import Path
-import os
 import asyncio
 
-# Ensure the application package is importable
-sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.services import transfer_service as transfer_module
+from app.services.transfer_service import TransferService
 
-# Provide required environment variable for encryption service during import
-os.environ.setdefault("ENCRYPTION_PASSWORD", "test")
 
-from app.services.transfer_service import TransferService
+@pytest.fixture(autouse=True)
+def _fresh_http_client(monkeypatch):
+    # The shared client is bound to the event loop it was first used on
+    monkeypatch.setattr(transfer_module, "_http_client", None)
 
 
 class MockResponse:
@@ -24,13 +22,9 @@ class MockResponse:
 
 
 class MockAsyncClient:
-    def __init__(self, *args, **kwargs):
-        pass
+    is_closed = False
 
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(self, exc_type, exc, tb):
+    def __init__(self, *args, **kwargs):
         pass
 
     async def post(self, *args, **kwargs):
@@ -66,6 +60,31 @@ def test_transfer_to_webhook_put(monkeypatch):
     assert result["response_body"] == "ok"
 
 
+def test_transfer_to_webhook_batch_coalesces_payloads(monkeypatch):
+    requests = []
+
+    class RecordingClient(MockAsyncClient):
+        async def request(self, method, url, **kwargs):
+            requests.append((method, url, json.loads(kwargs["content"])))
+            return MockResponse()
+
+    monkeypatch.setattr("app.services.transfer_service.httpx.AsyncClient", RecordingClient)
+    config = {"webhook_url": "http://example.com", "batch": True}
+
+    async def send_all():
+        return await asyncio.gather(*(
+            TransferService._transfer_to_webhook({"n": n}, config, f"t{n}") for n in range(3)
+        ))
+
+    results = asyncio.run(send_all())
+
+    assert len(requests) == 1
+    method, url, body = requests[0]
+    assert (method, url) == ("POST", "http://example.com")
+    assert [item["data"] for item in body["batch"]] == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert all(result["status_code"] == 200 for result in results)
+
+
 def test_transfer_to_webhook_missing_url():
     with pytest.raises(ValueError):
         asyncio.run(TransferService._transfer_to_webhook({}, {}, "t1"))
@@ -103,6 +122,45 @@ def test_transfer_to_file_csv(tmp_path):
     assert result["file_format"] == "csv"
 
 
+def test_transfer_to_file_csv_aligns_rows_to_header(tmp_path):
+    file_path = tmp_path / "out.csv"
+    data = [{"a": 1, "b": 2}, {"b": 4, "a": 3}, {"a": 5}]
+    config = {"file_path": str(file_path), "format": "csv"}
+
+    asyncio.run(TransferService._transfer_to_file(data, config, "t1"))
+
+    assert file_path.read_text().splitlines() == ["a,b", "1,2", "3,4", "5,"]
+
+    with pytest.raises(ValueError):
+        asyncio.run(TransferService._transfer_to_file([{"a": 1}, {"c": 2}], config, "t1"))
+
+
+def test_transfer_to_file_append_reports_total_size(tmp_path):
+    file_path = tmp_path / "out.txt"
+    config = {"file_path": str(file_path), "format": "txt", "append": True}
+
+    asyncio.run(TransferService._transfer_to_file("first", config, "t1"))
+    result = asyncio.run(TransferService._transfer_to_file("zweite Zeile äö", config, "t2"))
+
+    assert result["file_size"] == file_path.stat().st_size
+
+
+def test_transfer_to_file_batch(tmp_path):
+    files = [
+        {"file_path": str(tmp_path / "a" / "one.json")},
+        {"file_path": str(tmp_path / "b" / "two.csv"), "format": "csv"},
+    ]
+    data = [{"foo": "bar"}, [{"a": 1}]]
+
+    result = asyncio.run(TransferService._transfer_to_file(data, {"files": files}, "t1"))
+
+    assert result["file_count"] == 2
+    with open(tmp_path / "a" / "one.json") as f:
+        assert json.load(f)["data"] == {"foo": "bar"}
+    assert (tmp_path / "b" / "two.csv").read_text().splitlines() == ["a", "1"]
+    assert result["files"][1]["file_size"] == (tmp_path / "b" / "two.csv").stat().st_size
+
+
 def test_transfer_data_unknown_destination():
     with pytest.raises(ValueError):
         asyncio.run(TransferService.transfer_data({}, "unknown"))
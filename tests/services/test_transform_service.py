@@ -1,13 +1,10 @@
-import os
-import sys
-from pathlib import Path
 import pytest
 import re
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 
-sys.path.append(str(Path(__file__).resolve().parents[2]))
-os.environ.setdefault("ENCRYPTION_PASSWORD", "test-password")
-
-from app.services.transform_service import TransformService
+from app.database.models import TransformRule
+from app.services.transform_service import TransformRules, TransformService
 
 
 def test_apply_string_transformations_uppercase_regex_prefix():
@@ -48,6 +45,15 @@ def test_apply_dict_transformations_filter_rename_flatten():
     assert result == {"kept": 1, "nested.a": 3}
 
 
+def test_apply_dict_transformations_rename_pops_and_assigns_in_mapping_order():
+    rules = {"rename_keys": True, "key_mapping": {"a": "b"}}
+    assert TransformService._apply_dict_transformations({"a": 1, "b": 2}, rules) == {"b": 1}
+
+    rules = {"rename_keys": True, "key_mapping": {"a": "b", "b": "c"}}
+    result = TransformService._apply_dict_transformations({"a": 1, "x": 0}, rules)
+    assert list(result.items()) == [("x", 0), ("c", 1)]
+
+
 def test_apply_list_transformations_sort_limit_unique():
     data = [3, 1, 2, 3, 2]
     rules = {"sort": True, "limit": True, "limit_size": 3, "unique": True}
@@ -55,6 +61,42 @@ def test_apply_list_transformations_sort_limit_unique():
     assert result == [1, 2]
 
 
+def test_apply_list_transformations_numeric_items():
+    data = [1, 2.5, -4]
+    rules = {"multiply": True, "multiply_by": 2, "absolute": True}
+    result = TransformService._apply_list_transformations(data, rules)
+    assert result == [2, 5.0, 8]
+    # Rounding matches round() whether the list is all floats or mixed; bool lists are left alone
+    rules = {"round": True, "decimal_places": 2}
+    assert TransformService._apply_list_transformations([2.675, 1.005], rules) == [round(2.675, 2), round(1.005, 2)]
+    assert TransformService._apply_list_transformations([True, 2], {"add": True, "add_value": 1}) == [True, 2]
+
+
+def test_apply_list_transformations_string_items():
+    data = [" a-b ", "c-d"]
+    rules = {"uppercase": True, "strip": True, "replace": {"old": "-", "new": "_"}}
+    result = TransformService._apply_list_transformations(data, rules)
+    assert result == ["A_B", "C_D"]
+    # Same results as str methods item by item: full case mapping, str.strip whitespace
+    assert TransformService._apply_list_transformations(["straße\x1c", "\u00a0x"], rules) == ["STRASSE", "X"]
+
+
+def test_transform_rules_from_dict_reads_active_rules_once():
+    rules = TransformRules.from_dict({
+        "divide": True, "divide_by": 0,
+        "multiply": True,
+        "replace": {"old": "-"},
+        "limit": False, "limit_size": 2,
+    })
+
+    assert rules.divide_by is None
+    assert rules.multiply_by == 1
+    assert rules.replace == ("-", "")
+    assert rules.limit_size is None
+    assert rules.has_numeric_rules and rules.has_string_rules
+    assert TransformService._apply_string_transformations("a-b", rules) == "ab"
+
+
 def test_transform_data_valid_and_invalid_rules():
     assert TransformService.transform_data("hello", {"uppercase": True}) == "HELLO"
 
@@ -62,3 +104,179 @@ def test_transform_data_valid_and_invalid_rules():
         TransformService.transform_data(
             "hello", {"regex_replace": {"pattern": "["}}
         )
+
+
+def test_compile_rejects_invalid_regex_before_any_record():
+    with pytest.raises(re.error):
+        TransformService.compile({"regex_replace": {"pattern": "["}})
+
+    rules = TransformService.validate_rules({"regex_replace": {"pattern": "l+", "replacement": "L"}})
+    assert TransformService.compile({"regex_replace": {"pattern": "l+", "replacement": "L"}})("hello") == "heLo"
+    assert rules.regex_replace == ("l+", "L")
+
+
+def test_get_transform_rule_cached_until_invalidated(monkeypatch):
+    from app.services import transform_service as transform_module
+
+    calls = []
+    monkeypatch.setattr(
+        transform_module.etl_db, "get_transform_rule", lambda name: calls.append(name) or None
+    )
+    TransformService.invalidate_rules()
+
+    assert TransformService._get_transform_rule("missing") is None
+    assert TransformService._get_transform_rule("missing") is None
+    assert calls == ["missing"]
+
+    TransformService.invalidate_rules()
+    TransformService._get_transform_rule("missing")
+    assert calls == ["missing", "missing"]
+
+
+def test_regex_replace_uses_re2_only_when_strict_linear(monkeypatch):
+    from app.services import transform_service as transform_module
+
+    compiled = []
+
+    class FakeRe2:
+        class error(Exception):
+            pass
+
+        @staticmethod
+        def compile(pattern):
+            if "(?=" in pattern:
+                raise FakeRe2.error("lookaround not supported")
+            compiled.append(pattern)
+            return re.compile(pattern)
+
+    monkeypatch.setattr(transform_module, "re2", FakeRe2, raising=False)
+    monkeypatch.setattr(transform_module, "RE2_AVAILABLE", True)
+    transform_module._compile.cache_clear()
+    try:
+        assert TransformService.transform_data("hello", {"regex_replace": {"pattern": "l+", "replacement": "L"}}) == "heLo"
+        assert compiled == []
+
+        rules = {"regex_replace": {"pattern": "a(?=b)", "replacement": "x"}}
+        assert TransformService.transform_data("abac", rules) == "xbac"
+
+        strict = {"regex_replace": {"pattern": "l+", "replacement": "L", "strict_linear": True}}
+        assert TransformService.transform_data("hello", strict) == "heLo"
+        assert compiled == ["l+"]
+
+        with pytest.raises(re.error):
+            TransformService.transform_data("hello", {"regex_replace": {"pattern": "(?=["}})
+
+        strict = {"regex_replace": {"pattern": "a(?=b)", "replacement": "x", "strict_linear": True}}
+        with pytest.raises(re.error):
+            TransformService.transform_data("abac", strict)
+    finally:
+        transform_module._compile.cache_clear()
+
+
+def test_regex_replace_strict_linear_with_re2():
+    pytest.importorskip("re2")
+
+    for pattern, replacement, text in [
+        (r"(\d+)-(\d+)", r"\2-\1", "12-34 5-6"),
+        (r"(?P<plz>\d{5})\s+", r"\g<plz>|", "12345  Berlin"),
+        (r"\s+", r"\n", "a  b\tc"),
+    ]:
+        rules = {"regex_replace": {"pattern": pattern, "replacement": replacement, "strict_linear": True}}
+        assert TransformService.transform_data(text, rules) == re.sub(pattern, replacement, text)
+
+    with pytest.raises(re.error):
+        TransformService.compile({"regex_replace": {"pattern": r"(a)\1", "strict_linear": True}})
+
+
+@pytest.fixture
+def patched_html_transform(monkeypatch):
+    """Rule lookup and HTML-to-XML transform replaced by mocks, with empty rule caches"""
+    from app.services import transform_service as transform_module
+
+    transform = MagicMock(side_effect=lambda html, rules: f"<xml>{transform.call_count}</xml>")
+    get_rule = MagicMock(return_value=None)
+    monkeypatch.setattr(transform_module.HTMLToXMLTransformService, "transform_html_to_xml", transform)
+    monkeypatch.setattr(transform_module.etl_db, "get_transform_rule", get_rule)
+    TransformService.invalidate_rules()
+    yield SimpleNamespace(get_rule=get_rule, transform=transform)
+    TransformService.invalidate_rules()
+
+
+def test_transform_with_database_rule_calls_html_transform(patched_html_transform):
+    rule = TransformRule(rule_name="basic", rules=[{"action": "extract_text"}])
+    patched_html_transform.get_rule.return_value = rule
+
+    result = TransformService.transform_data({"html": "<p>a</p>"}, {"rule_name": "basic"})
+
+    assert result == "<xml>1</xml>"
+    patched_html_transform.transform.assert_called_once_with("<p>a</p>", rule.rules)
+
+
+def test_transform_with_database_rule_raises_when_rule_missing(patched_html_transform):
+    with pytest.raises(ValueError, match="not found"):
+        TransformService.transform_data("<p>a</p>", {"rule_name": "missing"})
+
+    patched_html_transform.transform.assert_not_called()
+
+
+def test_transform_with_database_rule_reuses_result_for_same_html(patched_html_transform):
+    patched_html_transform.get_rule.return_value = TransformRule(rule_name="basic", rules=[])
+
+    assert TransformService.transform_data("<p>a</p>", {"rule_name": "basic"}) == "<xml>1</xml>"
+    assert TransformService.transform_data({"html": "<p>a</p>"}, {"rule_name": "basic"}) == "<xml>1</xml>"
+    assert TransformService.transform_data("<p>b</p>", {"rule_name": "basic"}) == "<xml>2</xml>"
+
+    TransformService.invalidate_rules()
+    assert TransformService.transform_data("<p>a</p>", {"rule_name": "basic"}) == "<xml>3</xml>"
+
+
+def test_transform_with_database_rule_recomputes_auto_timestamp(monkeypatch):
+    from datetime import datetime
+    from app.services import html_transform_service as html_module
+    from app.services import transform_service as transform_module
+
+    class FakeDatetime:
+        calls = 0
+
+        @classmethod
+        def now(cls):
+            cls.calls += 1
+            return datetime(2024, 1, 1, 12, 0, cls.calls)
+
+    rule = TransformRule(rule_name="meta", rules=[
+        {"action": "extract_text", "target": "p", "output": "content"},
+        {"action": "wrap_xml", "add_metadata": {"timestamp": "auto"}},
+    ])
+    monkeypatch.setattr(html_module, "datetime", FakeDatetime)
+    monkeypatch.setattr(transform_module.etl_db, "get_transform_rule", lambda name: rule)
+    TransformService.invalidate_rules()
+    try:
+        first = TransformService.transform_data("<p>a</p>", {"rule_name": "meta"})
+        second = TransformService.transform_data("<p>a</p>", {"rule_name": "meta"})
+    finally:
+        TransformService.invalidate_rules()
+
+    assert "<timestamp>2024-01-01T12:00:01</timestamp>" in first
+    assert "<timestamp>2024-01-01T12:00:02</timestamp>" in second
+
+
+def test_compile_applies_parsed_rules_to_each_record():
+    transform = TransformService.compile({"uppercase": True, "multiply": True, "multiply_by": 2})
+
+    assert [transform(record) for record in ["a", 3, [1.5, 2]]] == ["A", 6, [3.0, 4]]
+    assert TransformService.compile({})("same") == "same"
+
+
+def test_transform_to_json_bytes_serializes_flattened_dict():
+    rules = {"flatten": True, "to_json": True}
+
+    result = TransformService.transform_to_json_bytes({"a": {"b": 1}, 2: "x"}, rules)
+
+    assert result == b'{"a.b":1,"2":"x"}'
+    assert result.decode() == TransformService.transform_data({"a": {"b": 1}, 2: "x"}, rules)
+
+
+def test_regex_replace_literal_pattern_matches_re_sub():
+    for pattern, replacement in [("o", "0"), ("", "-"), ("lo", r"\g<0>\n")]:
+        rules = {"regex_replace": {"pattern": pattern, "replacement": replacement}}
+        assert TransformService.transform_data("hello world", rules) == re.sub(pattern, replacement, "hello world")
@@ -0,0 +1,101 @@
+from app.services.xml_template_service import XMLTemplateService
+
+
+TEMPLATE = (
+    '<?xml version="1.0" encoding="windows-1252"?>'
+    "<AhList><Ah><Nr>A0</Nr><Info></Info><Erledigt>true</Erledigt></Ah></AhList>"
+)
+
+
+def test_populate_work_order_template_sets_fields_and_formats():
+    data = {"problem_description": "Heizung defekt", "contact_person": "Frau X"}
+
+    result = XMLTemplateService.populate_work_order_template(TEMPLATE, data, "A123")
+
+    lines = result.splitlines()
+    assert lines[0] == '<?xml version="1.0" encoding="windows-1252"?>'
+    assert lines[1] == "<AhList>"
+    assert "    <Nr>A123</Nr>" in lines
+    assert "    <Info>Heizung defekt</Info>" in lines
+    assert "    <Erledigt>false</Erledigt>" in lines
+    assert "Meldender: Frau X</VortextTxt>" in result
+
+
+def test_validate_taifun_xml_reports_missing_fields():
+    result = XMLTemplateService.validate_taifun_xml(TEMPLATE)
+
+    assert result["valid"] is True
+    assert result["warnings"] == ["Taifun-Namespace fehlt", "Feld 'Date' fehlt"]
+
+
+def test_validate_taifun_xml_finds_namespaced_ah():
+    xml = (
+        '<AhList xmlns="urn:taifun-software.de:schema:TAIFUN">'
+        "<Ah><Nr>A1</Nr><Date>2024-01-01</Date><Info>x</Info></Ah></AhList>"
+    )
+
+    result = XMLTemplateService.validate_taifun_xml(xml)
+
+    assert result == {"valid": True, "errors": [], "warnings": []}
+
+
+def test_populate_does_not_modify_cached_template(tmp_path):
+    template_path = tmp_path / "leer.xml"
+    template_path.write_text(TEMPLATE, encoding="windows-1252")
+    template = XMLTemplateService.load_template_from_file(str(template_path))
+
+    first = XMLTemplateService.populate_work_order_template(template, {"problem_description": "Erster"}, "A1")
+    second = XMLTemplateService.populate_work_order_template(template, {}, "A2")
+
+    assert "Erster" in first
+    assert "Erster" not in second
+    assert XMLTemplateService.get_template_root(str(template_path)).find("Ah/Nr").text == "A0"
+
+
+def test_populate_namespaced_template_updates_fields_in_place():
+    template = (
+        '<?xml version="1.0" encoding="windows-1252"?>'
+        '<AhList xmlns="urn:taifun-software.de:schema:TAIFUN"><Ah><Nr>A0</Nr></Ah></AhList>'
+    )
+
+    result = XMLTemplateService.populate_work_order_template(template, {"technician": "MAX"}, "A7")
+
+    # Prefix-agnostic: the stdlib fallback serializes the namespace as ns0:
+    assert "Nr>A0<" not in result
+    assert result.count("Nr>A7<") == 1
+    assert "MaMatch>MAX<" in result
+
+
+def test_populate_many_fills_one_document_per_order():
+    orders = [({"problem_description": "Eins"}, "A1"), ({"problem_description": "Zwei"}, "A2")]
+
+    results = XMLTemplateService.populate_many(TEMPLATE, orders)
+
+    assert len(results) == 2
+    assert "Nr>A1<" in results[0] and "Info>Eins<" in results[0]
+    assert "Nr>A2<" in results[1] and "Info>Zwei<" in results[1]
+    assert "Eins" not in results[1]
+
+
+def test_validate_taifun_xml_rejects_large_truncated_document():
+    xml = (
+        '<AhList xmlns="urn:taifun-software.de:schema:TAIFUN">'
+        "<Ah><Nr>A1</Nr><Date>2024-01-01</Date><Info>x</Info></Ah>"
+        + "<!-- padding -->" * 5000
+        + "<Ah>"
+    )
+    assert len(xml) > 64 * 1024
+
+    result = XMLTemplateService.validate_taifun_xml(xml)
+
+    assert result["valid"] is False
+    assert result["errors"][0].startswith("XML Parse Error")
+
+
+def test_populate_drops_xml_invalid_control_characters():
+    data = {"problem_description": "Heizung\x0b defekt", "contact_person": "Frau\x0cX"}
+
+    result = XMLTemplateService.populate_work_order_template(TEMPLATE, data, "A1")
+
+    assert "<Info>Heizung defekt</Info>" in result
+    assert "Meldender: FrauX" in result